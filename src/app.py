@@ -3,13 +3,15 @@ from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi_cache import FastAPICache
-from fastapi_cache.backends.inmemory import InMemoryBackend
 from loguru import logger
 
 from src.configs.loguru import logger_config
 from src.entrypoints import router
 from src.middleware.logger_middleware import LoggerMiddleware
+from src.services.logging_service import LoggingService
+from src.services.metrics_service import MetricsService
+from src.services.scenario_service import ScenarioService
+from src.services.worker_pool_service import WorkerPoolService
 
 APP_ROOT = Path(__file__).parent
 logger.configure(**logger_config())
@@ -18,8 +20,16 @@ logger.configure(**logger_config())
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("starting up")
+    WorkerPoolService.start()
+    LoggingService.start()
+    MetricsService.start()
     yield
     logger.info("shutting down")
+    WorkerPoolService.shutdown()
+    await LoggingService.stop()
+    await MetricsService.stop()
+    await logger.complete()
+    await ScenarioService.close()
 
 
 def get_app() -> FastAPI:
@@ -48,6 +58,4 @@ def get_app() -> FastAPI:
         logger=logger,
     )
     _app.include_router(router=router)
-
-    FastAPICache.init(InMemoryBackend(), prefix="fastapi-cache")
     return _app
@@ -3,6 +3,7 @@ Application's and its environment's configuration.
 """
 
 import os
+import tempfile
 
 
 class Config:
@@ -17,6 +18,89 @@ class Config:
     WORKERS_COUNT = int(os.getenv("WORKERS_COUNT", "1"))
     RELOAD = os.getenv("RELOAD", "false").lower() == "true"
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
 
     LOGGER_API_URL: str = os.getenv("LOGGER_API_URL")
-    LOGGER_API_KEY: str = os.getenv("LOGGER_API_KEY")
+    LOGGER_API_KEY: str = os.getenv("LOGGER_API_KEY")
+    LOGGER_API_TIMEOUT = float(os.getenv("LOGGER_API_TIMEOUT", "11"))
+
+    LOG_SHIPPING_QUEUE_SIZE = int(os.getenv("LOG_SHIPPING_QUEUE_SIZE", "64"))
+    LOG_SHIPPING_BATCH_SIZE = int(os.getenv("LOG_SHIPPING_BATCH_SIZE", "8"))
+    LOG_SHIPPING_MAX_RETRIES = int(os.getenv("LOG_SHIPPING_MAX_RETRIES", "5"))
+    LOG_SHIPPING_BACKOFF_SECONDS = float(
+        os.getenv("LOG_SHIPPING_BACKOFF_SECONDS", "0.5")
+    )
+    LOG_SPOOL_DIR = os.getenv(
+        "LOG_SPOOL_DIR",
+        os.path.join(tempfile.gettempdir(), "edge-sim-py-api", "log-spool"),
+    )
+    LOG_SPOOL_RETRY_SECONDS = float(os.getenv("LOG_SPOOL_RETRY_SECONDS", "30"))
+
+    LOG_REQUEST_SAMPLE_RATE = float(os.getenv("LOG_REQUEST_SAMPLE_RATE", "1"))
+    LOG_REQUEST_ROUTE_SAMPLE_RATES = os.getenv("LOG_REQUEST_ROUTE_SAMPLE_RATES", "")
+    LOG_BODY_PREVIEW_BYTES = int(os.getenv("LOG_BODY_PREVIEW_BYTES", "256"))
+
+    # Each uvicorn worker runs its own pool, so they share the CPUs between them.
+    SIMULATION_WORKERS = int(
+        os.getenv(
+            "SIMULATION_WORKERS", str(max(1, (os.cpu_count() or 1) // WORKERS_COUNT))
+        )
+    )
+    SIMULATION_WORKER_MAX_JOBS = int(os.getenv("SIMULATION_WORKER_MAX_JOBS", "50"))
+    SIMULATION_WORKER_MAX_MEMORY_MB = int(
+        os.getenv("SIMULATION_WORKER_MAX_MEMORY_MB", "1024")
+    )
+
+    SIMULATION_SEED = int(os.getenv("SIMULATION_SEED", "428956419"))
+    SIMULATION_MAX_STEPS = int(os.getenv("SIMULATION_MAX_STEPS", "100"))
+    SIMULATION_IDLE_STEPS_LIMIT = int(os.getenv("SIMULATION_IDLE_STEPS_LIMIT", "0"))
+    SIMULATION_JOBS_DIR = os.getenv(
+        "SIMULATION_JOBS_DIR",
+        os.path.join(tempfile.gettempdir(), "edge-sim-py-api", "jobs"),
+    )
+    SIMULATION_JOBS_MAX_BYTES = int(
+        os.getenv("SIMULATION_JOBS_MAX_BYTES", str(256 * 2**20))
+    )
+    SIMULATION_STREAM_BUFFER = int(os.getenv("SIMULATION_STREAM_BUFFER", "8"))
+    SIMULATION_BATCH_MAX_RUNS = int(os.getenv("SIMULATION_BATCH_MAX_RUNS", "1000"))
+
+    RESULT_CACHE_MAX_BYTES = int(
+        os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 2**20))
+    )
+    RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "")
+
+    SCENARIO_MAX_BYTES = int(os.getenv("SCENARIO_MAX_BYTES", str(64 * 2**20)))
+    SCENARIO_FETCH_TIMEOUT = float(os.getenv("SCENARIO_FETCH_TIMEOUT", "30"))
+    SCENARIO_CACHE_MAX_BYTES = int(
+        os.getenv("SCENARIO_CACHE_MAX_BYTES", str(256 * 2**20))
+    )
+    SCENARIO_CACHE_FRESH_SECONDS = float(
+        os.getenv("SCENARIO_CACHE_FRESH_SECONDS", "60")
+    )
+    SCENARIO_CACHE_DIR = os.getenv("SCENARIO_CACHE_DIR", "")
+
+    SNAPSHOT_CACHE_MAX_BYTES = int(
+        os.getenv("SNAPSHOT_CACHE_MAX_BYTES", str(256 * 2**20))
+    )
+    SNAPSHOT_CACHE_DIR = os.getenv("SNAPSHOT_CACHE_DIR", "")
+
+    SMMS_NEGOTIATION_DEPTH = int(os.getenv("SMMS_NEGOTIATION_DEPTH", "2"))
+    SMMS_NEGOTIATION_BUDGET = int(os.getenv("SMMS_NEGOTIATION_BUDGET", "1000"))
+    SMMS_PROPOSAL_THREADS = int(
+        os.getenv("SMMS_PROPOSAL_THREADS", str(os.cpu_count() or 1))
+    )
+    SMMS_PROPOSAL_CHUNK_SIZE = int(os.getenv("SMMS_PROPOSAL_CHUNK_SIZE", "256"))
+
+    PROFILE_DIR = os.getenv(
+        "PROFILE_DIR",
+        os.path.join(tempfile.gettempdir(), "edge-sim-py-api", "profiles"),
+    )
+    PROFILE_MAX_BYTES = int(os.getenv("PROFILE_MAX_BYTES", str(256 * 2**20)))
+
+    METRICS_DIR = os.getenv(
+        "METRICS_DIR",
+        os.path.join(tempfile.gettempdir(), "edge-sim-py-api", "metrics"),
+    )
+    METRICS_WRITE_INTERVAL_SECONDS = float(
+        os.getenv("METRICS_WRITE_INTERVAL_SECONDS", "5")
+    )
@@ -1,42 +1,67 @@
+import json
 import sys
+import traceback
 
+from src.configs.env import Config
 from src.middleware.logger_middleware import REQUEST_UUID
 
+_TEXT_FORMAT = "<green>{{time}}</green> | <{level_color}>{{level}}</{level_color}> | <cyan>{{name}}<white>:</white>{{function}}<white>:</white>{{line}}</cyan> | <magenta>{{extra[request_uuid]}}</magenta> | <{message_color}>{{message}}</{message_color}>\n{{exception}}"  # noqa
+
+_TEXT_FORMATS = {
+    "INFO": _TEXT_FORMAT.format(level_color="level", message_color="white"),
+    "ERROR": _TEXT_FORMAT.format(level_color="red", message_color="red"),
+    "WARNING": _TEXT_FORMAT.format(level_color="yellow", message_color="yellow"),
+    "DEBUG": _TEXT_FORMAT.format(level_color="blue", message_color="blue"),
+}
+"""Format of each level's records, compiled once."""
+
 
 def add_request_uuid(record):
     record["extra"]["request_uuid"] = REQUEST_UUID.get()
 
 
+def format_text(record) -> str:
+    return _TEXT_FORMATS.get(record["level"].name, _TEXT_FORMATS["INFO"])
+
+
+def format_json(record) -> str:
+    """
+    One compact JSON object per record. It is built here and passed through
+    `extra`, since whatever a format function returns is itself a template.
+    """
+    entry = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "name": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "request_uuid": (
+            str(record["extra"]["request_uuid"])
+            if record["extra"].get("request_uuid") is not None
+            else None
+        ),
+        "message": record["message"],
+    }
+    if record["exception"] is not None:
+        entry["exception"] = "".join(traceback.format_exception(*record["exception"]))
+    record["extra"]["json"] = json.dumps(entry, separators=(",", ":"), default=str)
+    return "{extra[json]}\n"
+
+
 def logger_config():
+    """
+    A single sink writing from a background thread, so logging never blocks the
+    event loop or a simulation on stdout. Records below `LOG_LEVEL` are dropped
+    before they are formatted.
+    """
     return {
         "handlers": [
             {
                 "sink": sys.stdout,
-                "format": "<green>{time}</green> | <level>{level}</level> | <cyan>{name}<white>:</white>{function}<white>:</white>{line}</cyan> | <magenta>{extra[request_uuid]}</magenta> | <white>{message}</white>",  # noqa
-                "serialize": False,
-                "level": "INFO",
-                "filter": lambda record: record["level"].name == "INFO",
-            },
-            {
-                "sink": sys.stdout,
-                "format": "<green>{time}</green> | <red>{level}</red> | <cyan>{name}<white>:</white>{function}<white>:</white>{line}</cyan> | <magenta>{extra[request_uuid]}</magenta> | <red>{message}</red>",  # noqa
-                "serialize": False,
-                "level": "ERROR",
-                "filter": lambda record: record["level"].name == "ERROR",
-            },
-            {
-                "sink": sys.stdout,
-                "format": "<green>{time}</green> | <yellow>{level}</yellow> | <cyan>{name}<white>:</white>{function}<white>:</white>{line}</cyan> | <magenta>{extra[request_uuid]}</magenta> | <yellow>{message}</yellow>",  # noqa
-                "serialize": False,
-                "level": "WARNING",
-                "filter": lambda record: record["level"].name == "WARNING",
-            },
-            {
-                "sink": sys.stdout,
-                "format": "<green>{time}</green> | <blue>{level}</blue> | <cyan>{name}<white>:</white>{function}<white>:</white>{line}</cyan> | <magenta>{extra[request_uuid]}</magenta> | <blue>{message}</blue>",  # noqa
+                "format": format_json if Config.LOG_FORMAT == "json" else format_text,
+                "level": Config.LOG_LEVEL.upper(),
+                "enqueue": True,
                 "serialize": False,
-                "level": "DEBUG",
-                "filter": lambda record: record["level"].name == "DEBUG",
             },
         ],
         "patcher": add_request_uuid,
@@ -1,10 +1,11 @@
 from fastapi.routing import APIRouter
 
-from src.entrypoints import simulation_entrypoint
+from src.entrypoints import metrics_entrypoint, simulation_entrypoint
 
 router = APIRouter()
 router.include_router(
     simulation_entrypoint.router, prefix="/simulation", tags=["Simulation"]
 )
+router.include_router(metrics_entrypoint.router, tags=["Metrics"])
 
 __all__ = ["router"]
@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.services.metrics_service import MetricsService
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics_entrypoint() -> PlainTextResponse:
+    """
+    Metrics of every API worker, in the Prometheus text format.
+    """
+    return PlainTextResponse(
+        await MetricsService.render(), media_type="text/plain; version=0.0.4"
+    )
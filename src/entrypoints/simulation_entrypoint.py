@@ -1,30 +1,354 @@
-import json
-from urllib.request import urlopen
+from pathlib import Path
+from typing import AsyncIterator
+from uuid import UUID
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import HttpUrl
+from pydantic_core import to_json
 
+from src.configs.env import Config
 from src.esp_algorithms import algorithm_options
-from src.schemas.simulation_schema import SimulationInput, SimulationServiceOutput
+from src.exceptions.http_exceptions import ProfileNotFoundException
+from src.schemas.batch_schema import (
+    SimulationBatchInput,
+    SimulationBatchOutput,
+    SimulationBatchRun,
+)
+from src.schemas.comparison_schema import (
+    SimulationComparisonInput,
+    SimulationComparisonOutput,
+)
+from src.schemas.job_schema import SimulationJob
+from src.schemas.simulation_schema import (
+    ServiceState,
+    SimulationInput,
+    SimulationResultQuery,
+    SimulationServiceColumnarOutput,
+    SimulationServiceOutput,
+)
+from src.services.batch_service import BatchService
+from src.services.comparison_service import ComparisonService
+from src.services.job_service import JobService
+from src.services.scenario_service import ScenarioService
 from src.services.simulation_service import SimulationService
+from src.utils.enums import SimulationResultFormat
+from src.utils.profiler import PROFILER, PhaseTimer, profile_phase
+from src.utils.responses import FastJSONResponse, ModelProjection
 
 router = APIRouter()
 
+ScenarioInput = SimulationInput | SimulationBatchInput | SimulationComparisonInput
+"""Any request body that carries a scenario in `url_or_json`."""
 
-@router.post("/services", response_model=SimulationServiceOutput | None)
+_service_states = ModelProjection(ServiceState)
+"""
+Simulation results come from our own workers, so they are shaped like
+`SimulationServiceOutput` without being validated against it.
+"""
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.edge-sim-py.columnar+json"
+
+_RESULT_RESPONSES = {
+    200: {
+        "content": {
+            COLUMNAR_MEDIA_TYPE: {
+                "schema": SimulationServiceColumnarOutput.model_json_schema()
+            }
+        },
+        "description": (
+            "One object per service and step or, with `format=columnar` or when "
+            "requested through the Accept header, one list per field."
+        ),
+    }
+}
+
+
+async def _load_input_file(simulation_input: ScenarioInput) -> dict:
+    input_file = simulation_input.url_or_json
+    if isinstance(input_file, HttpUrl):
+        with profile_phase("scenario_download"):
+            input_file = await ScenarioService.fetch(str(input_file))
+    return input_file
+
+
+def _result_query(
+    format: SimulationResultFormat = SimulationResultFormat.ROWS,
+    step_from: int | None = None,
+    step_to: int | None = None,
+    step_stride: int = Query(default=1, ge=1),
+    service_id: list[int] | None = Query(default=None),
+) -> SimulationResultQuery:
+    return SimulationResultQuery(
+        format=format,
+        step_from=step_from,
+        step_to=step_to,
+        step_stride=step_stride,
+        service_id=service_id,
+    )
+
+
+def _result_response(
+    results: list[dict] | None,
+    query: SimulationResultQuery,
+    accept: str | None,
+    extra_content: dict | None = None,
+    headers: dict | None = None,
+) -> FastJSONResponse:
+    """
+    Filter the service states as requested and lay them out as rows or columns.
+    """
+    if results is not None:
+        results = _select_results(results, query)
+
+    columnar = query.format == SimulationResultFormat.COLUMNAR or bool(
+        accept and COLUMNAR_MEDIA_TYPE in accept
+    )
+    if columnar and results is not None:
+        content = {"rows": len(results), "Service": _service_states.columns(results)}
+    else:
+        content = {"Service": _service_states.many(results)}
+    content.update(extra_content or {})
+    return FastJSONResponse(
+        content,
+        headers=headers,
+        media_type=COLUMNAR_MEDIA_TYPE if columnar else None,
+    )
+
+
+def _select_results(results: list[dict], query: SimulationResultQuery) -> list[dict]:
+    step_bounds = (query.step_from, query.step_to)
+    if step_bounds == (None, None) and query.step_stride == 1 and not query.service_id:
+        return results
+
+    step_from = query.step_from if query.step_from is not None else 0
+    step_to = query.step_to if query.step_to is not None else float("inf")
+    service_ids = set(query.service_id) if query.service_id else None
+
+    def selected(row: dict) -> bool:
+        step = row["Time Step"]
+        if not step_from <= step <= step_to:
+            return False
+        if (step - step_from) % query.step_stride:
+            return False
+        return service_ids is None or row["Instance ID"] in service_ids
+
+    return list(filter(selected, results))
+
+
+@router.post(
+    "/services",
+    response_model=SimulationServiceOutput | None,
+    response_class=FastJSONResponse,
+    responses=_RESULT_RESPONSES,
+)
 async def simulation_entrypoint(
     simulation_input: SimulationInput,
-) -> SimulationServiceOutput | None:
+    query: SimulationResultQuery = Depends(_result_query),
+    profile: bool = False,
+    cprofile: bool = False,
+    accept: str | None = Header(default=None),
+) -> FastJSONResponse:
     """
     Endpoint/controller to run the simulation.
+
+    The service states can be filtered by step range and service, downsampled to
+    every `step_stride`-th step, and returned as one list per field with
+    `format=columnar`.
+
+    With `profile`, the time spent in each phase is returned in the
+    `Server-Timing` header, and the phases and the time of each step in a
+    `profile` section. With `cprofile`, a cProfile dump of the simulation is also
+    captured and can be downloaded from `/profiles/{profile_id}`.
     """
-    input_file = simulation_input.url_or_json
-    if isinstance(input_file, HttpUrl):
-        input_file = json.loads(urlopen(str(input_file)).read())
-    return {
-        "Service": await SimulationService.run(
-            algorithm=algorithm_options[simulation_input.algorithm],
-            input_file=input_file,
-            metrics_from="Service",
+    timer = PhaseTimer(cprofile=cprofile) if profile or cprofile else None
+    PROFILER.set(timer)
+
+    results = await SimulationService.run(
+        algorithm=algorithm_options[simulation_input.algorithm],
+        input_file=await _load_input_file(simulation_input),
+        metrics_from="Service",
+        seed_value=simulation_input.seed,
+    )
+
+    return _result_response(
+        results,
+        query,
+        accept,
+        extra_content={"profile": timer.as_dict()} if timer is not None else None,
+        headers={"Server-Timing": timer.server_timing()} if timer is not None else None,
+    )
+
+
+@router.get(
+    "/profiles/{profile_id}",
+    response_class=FileResponse,
+    responses={200: {"content": {"application/octet-stream": {}}}},
+)
+async def get_simulation_profile(profile_id: UUID) -> FileResponse:
+    """
+    Download a cProfile dump captured with `cprofile`, readable with `pstats`.
+    """
+    path = Path(Config.PROFILE_DIR) / f"{profile_id}.prof"
+    if not path.is_file():
+        raise ProfileNotFoundException(profile_id)
+    return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+
+
+@router.post(
+    "/services/stream",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}, "text/event-stream": {}},
+            "description": (
+                'One {"Service": [...]} object per simulation step, as NDJSON or, '
+                "when requested through the Accept header, as server-sent events."
+            ),
+        }
+    },
+)
+async def stream_simulation(
+    simulation_input: SimulationInput, accept: str | None = Header(default=None)
+) -> StreamingResponse:
+    """
+    Run the simulation and stream each step's service states while it runs.
+    Disconnecting cancels the simulation.
+    """
+    steps = SimulationService.stream(
+        algorithm=algorithm_options[simulation_input.algorithm],
+        input_file=await _load_input_file(simulation_input),
+        metrics_from="Service",
+        seed_value=simulation_input.seed,
+    )
+    if accept and "text/event-stream" in accept:
+        return StreamingResponse(
+            _encode_server_sent_events(steps),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
         )
-    }
+    return StreamingResponse(_encode_ndjson(steps), media_type="application/x-ndjson")
+
+
+def _encode_step(step_metrics: list[dict]) -> bytes:
+    # Shaped like the output of `/services`, one step at a time.
+    return to_json({"Service": _service_states.many(step_metrics)})
+
+
+async def _encode_ndjson(steps: AsyncIterator[list[dict]]) -> AsyncIterator[bytes]:
+    try:
+        async for step_metrics in steps:
+            yield _encode_step(step_metrics) + b"\n"
+    except HTTPException as error:
+        # The status line is already sent, so the error goes in the stream.
+        yield to_json({"error": error.detail}) + b"\n"
+
+
+async def _encode_server_sent_events(
+    steps: AsyncIterator[list[dict]],
+) -> AsyncIterator[bytes]:
+    try:
+        async for step_metrics in steps:
+            yield b"event: step\ndata: " + _encode_step(step_metrics) + b"\n\n"
+    except HTTPException as error:
+        yield b"event: error\ndata: " + to_json({"error": error.detail}) + b"\n\n"
+        return
+    yield b"event: end\ndata: {}\n\n"
+
+
+@router.post(
+    "/batch",
+    response_model=SimulationBatchOutput,
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}},
+            "description": (
+                "All runs at once or, when requested through the Accept header, "
+                "one run per NDJSON line as soon as it finishes."
+            ),
+        }
+    },
+)
+async def run_simulation_batch(
+    batch_input: SimulationBatchInput, accept: str | None = Header(default=None)
+) -> SimulationBatchOutput | StreamingResponse:
+    """
+    Run every combination of the given algorithms and seeds over one scenario.
+    """
+    BatchService.runs(batch_input)
+    input_file = await _load_input_file(batch_input)
+    if accept and "application/x-ndjson" in accept:
+        return StreamingResponse(
+            _encode_batch_runs(BatchService.stream(batch_input, input_file)),
+            media_type="application/x-ndjson",
+        )
+    return {"runs": await BatchService.run(batch_input, input_file)}
+
+
+async def _encode_batch_runs(
+    runs: AsyncIterator[SimulationBatchRun],
+) -> AsyncIterator[str]:
+    async for run in runs:
+        yield run.model_dump_json(by_alias=True) + "\n"
+
+
+@router.post("/compare", response_model=SimulationComparisonOutput)
+async def compare_algorithms(
+    comparison_input: SimulationComparisonInput,
+) -> SimulationComparisonOutput:
+    """
+    Run several algorithms concurrently on the same scenario and seed, and compare
+    their results against the first one.
+    """
+    runs = await ComparisonService.compare(
+        comparison_input, await _load_input_file(comparison_input)
+    )
+    return {"baseline": comparison_input.algorithms[0], "runs": runs}
+
+
+@router.post(
+    "/jobs", response_model=SimulationJob, status_code=status.HTTP_202_ACCEPTED
+)
+async def submit_simulation_job(
+    simulation_input: SimulationInput, profile: bool = False, cprofile: bool = False
+) -> SimulationJob:
+    """
+    Schedule a simulation and return its job without waiting for it to finish.
+
+    With `profile` or `cprofile`, the job is profiled like a `/services` request
+    and its `profile` section is returned with the job once it is done.
+    """
+    return await JobService.submit(
+        algorithm=simulation_input.algorithm,
+        input_file=await _load_input_file(simulation_input),
+        metrics_from="Service",
+        seed_value=simulation_input.seed,
+        profile=profile,
+        cprofile=cprofile,
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=SimulationJob)
+async def get_simulation_job(job_id: UUID) -> SimulationJob:
+    """
+    Get the current status of a simulation job.
+    """
+    return await JobService.get(job_id)
+
+
+@router.get(
+    "/jobs/{job_id}/result",
+    response_model=SimulationServiceOutput | None,
+    response_class=FastJSONResponse,
+    responses=_RESULT_RESPONSES,
+)
+async def get_simulation_job_result(
+    job_id: UUID,
+    query: SimulationResultQuery = Depends(_result_query),
+    accept: str | None = Header(default=None),
+) -> FastJSONResponse:
+    """
+    Get the output of a finished simulation job, shaped like the output of
+    `/services`.
+    """
+    return _result_response(await JobService.result(job_id), query, accept)
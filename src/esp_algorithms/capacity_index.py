@@ -0,0 +1,114 @@
+import edge_sim_py as esp
+
+
+class CapacityIndex:
+    """
+    Free CPU and memory of every edge server, kept in max segment trees over the
+    servers' order in EdgeServer.all().
+
+    Updating a server after a provisioning costs O(log n), and finding the first
+    server (in EdgeServer.all() order) with room for a service skips whole ranges of
+    servers that are too full. Disk space depends on the container layers already on
+    each server, so candidates are still confirmed with `has_capacity_to_host`.
+    """
+
+    def __init__(self, servers: list[esp.EdgeServer]):
+        self.servers: list[esp.EdgeServer] = list(servers)
+        self._positions: dict[int, int] = {
+            server.id: position for position, server in enumerate(self.servers)
+        }
+        self._leaves = 1
+        while self._leaves < len(self.servers):
+            self._leaves *= 2
+        self._free_cpu = [float("-inf")] * (2 * self._leaves)
+        self._free_memory = [float("-inf")] * (2 * self._leaves)
+
+        for position, server in enumerate(self.servers):
+            leaf = self._leaves + position
+            self._free_cpu[leaf] = server.cpu - server.cpu_demand
+            self._free_memory[leaf] = server.memory - server.memory_demand
+        for node in range(self._leaves - 1, 0, -1):
+            self._free_cpu[node] = max(
+                self._free_cpu[2 * node], self._free_cpu[2 * node + 1]
+            )
+            self._free_memory[node] = max(
+                self._free_memory[2 * node], self._free_memory[2 * node + 1]
+            )
+
+    def update(self, server: esp.EdgeServer | None) -> None:
+        """
+        Refresh the free capacity of a server whose demand changed.
+        """
+        if server is None or server.id not in self._positions:
+            return
+        node = self._leaves + self._positions[server.id]
+        free_cpu = server.cpu - server.cpu_demand
+        free_memory = server.memory - server.memory_demand
+        if self._free_cpu[node] == free_cpu and self._free_memory[node] == free_memory:
+            return
+
+        self._free_cpu[node] = free_cpu
+        self._free_memory[node] = free_memory
+        node //= 2
+        while node:
+            self._free_cpu[node] = max(
+                self._free_cpu[2 * node], self._free_cpu[2 * node + 1]
+            )
+            self._free_memory[node] = max(
+                self._free_memory[2 * node], self._free_memory[2 * node + 1]
+            )
+            node //= 2
+
+    def synchronize(self) -> None:
+        """
+        Pick up capacity changes made by the simulator itself, such as migrations
+        that finished and released their origin server.
+        """
+        for server in self.servers:
+            self.update(server)
+
+    def may_host(self, server: esp.EdgeServer, service: esp.Service) -> bool:
+        """
+        Whether the server has enough free CPU and memory for the service.
+        """
+        return self._fits(self._leaves + self._positions[server.id], service)
+
+    def first_fit(self, service: esp.Service) -> esp.EdgeServer | None:
+        """
+        First server, in EdgeServer.all() order, that has capacity to host the
+        service.
+        """
+        nodes = [1]
+        while nodes:
+            node = nodes.pop()
+            if not self._fits(node, service):
+                continue
+            if node < self._leaves:
+                nodes.append(2 * node + 1)
+                nodes.append(2 * node)
+                continue
+            server = self.servers[node - self._leaves]
+            if server.has_capacity_to_host(service):
+                return server
+        return None
+
+    def _fits(self, node: int, service: esp.Service) -> bool:
+        if self._free_cpu[node] < service.cpu_demand:
+            return False
+        return self._free_memory[node] >= service.memory_demand
+
+
+def get_capacity_index(topology: object, current_step: int) -> CapacityIndex:
+    """
+    Gets the capacity index of the topology's edge servers. It is built once per
+    topology and synchronized with the servers once per simulation step; in between,
+    algorithms call `CapacityIndex.update` on the servers they provision services on.
+    """
+    if not hasattr(topology, "capacity_index"):
+        topology.capacity_index = CapacityIndex(esp.EdgeServer.all())
+        topology.capacity_index_synchronized_at = current_step
+
+    if topology.capacity_index_synchronized_at != current_step:
+        topology.capacity_index.synchronize()
+        topology.capacity_index_synchronized_at = current_step
+    return topology.capacity_index
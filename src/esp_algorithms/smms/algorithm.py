@@ -1,11 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 import edge_sim_py as esp
 from loguru import logger
 
+from src.configs.env import Config
+from src.esp_algorithms.capacity_index import get_capacity_index
 from src.esp_algorithms.smms.constants import LOGGING_IDENTIFIER
+from src.esp_algorithms.smms.migration_negotiation import MigrationNegotiation
 from src.esp_algorithms.smms.service_management_agent import ServiceManagementAgent
+from src.esp_algorithms.smms.user_distance_index import UserDistanceIndex
 from src.schemas.algorithm_parameters import AlgorithmInputParameters
+from src.utils.profiler import profile_phase
+
+_executor: ThreadPoolExecutor | None = None
 
 
 def service_management_multiagent_system_runner(
@@ -19,11 +27,59 @@ def service_management_multiagent_system_runner(
     parameters = AlgorithmInputParameters.model_validate(parameters)
     logger.info(f"{LOGGING_IDENTIFIER} [STEP {parameters.current_step}]")
 
-    _let_agents_think()
+    _let_agents_think(parameters.current_step)
+
+
+def _let_agents_think(current_step: int):
+    """
+    Agents first compute their proposals and then act on them one at a time in
+    their creation order. Acting in a fixed order keeps runs reproducible for a
+    given seed.
+
+    Proposals rank the servers by distance to each agent's users. Those rankings
+    are computed for every proposing agent at once, in NumPy batches spread over
+    `SMMS_PROPOSAL_THREADS` threads, before the agents pick them up.
 
+    Each agent's actions are only logged at the DEBUG level; the step is
+    summarized in a single line.
+    """
+    negotiation = ServiceManagementAgent.negotiation = MigrationNegotiation(
+        ServiceManagementAgent.distance_index,
+        get_capacity_index(esp.Topology.first(), current_step),
+        max_depth=Config.SMMS_NEGOTIATION_DEPTH,
+        budget=Config.SMMS_NEGOTIATION_BUDGET,
+    )
 
-def _let_agents_think():
-    [agent.step() for agent in ServiceManagementAgent.all()]
+    agents: list[ServiceManagementAgent] = ServiceManagementAgent.all()
+    with profile_phase("smms.proposals"):
+        ServiceManagementAgent.distance_index.rank(
+            [agent.service for agent in agents if agent.proposes()],
+            executor=_proposal_executor(),
+        )
+        proposals = [agent.propose() for agent in agents]
+    acting_agents = sum(
+        agent.resolve(proposal) for agent, proposal in zip(agents, proposals)
+    )
+    logger.info(
+        f"{LOGGING_IDENTIFIER} [STEP {current_step}] {acting_agents} of "
+        f"{len(agents)} agents looked for a host; "
+        f"{negotiation.capacity_version} services directed to a server"
+    )
+
+
+def _proposal_executor() -> ThreadPoolExecutor | None:
+    """
+    Threads computing proposals, shared by the runs of a simulation worker.
+    """
+    global _executor
+    if Config.SMMS_PROPOSAL_THREADS <= 1:
+        return None
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=Config.SMMS_PROPOSAL_THREADS,
+            thread_name_prefix="smms-proposals",
+        )
+    return _executor
 
 
 def _validate_simulation_agents_are_set():
@@ -32,6 +88,10 @@ def _validate_simulation_agents_are_set():
 
     logger.info(f"{LOGGING_IDENTIFIER} Setting up agents")
 
+    ServiceManagementAgent.distance_index = UserDistanceIndex(
+        esp.EdgeServer.all(), chunk_size=Config.SMMS_PROPOSAL_CHUNK_SIZE
+    )
+
     services: list[esp.Service] = esp.Service.all()
     for service in services:
         service.agent = ServiceManagementAgent(service)
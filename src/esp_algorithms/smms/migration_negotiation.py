@@ -0,0 +1,201 @@
+import edge_sim_py as esp
+from loguru import logger
+
+from src.esp_algorithms.capacity_index import CapacityIndex
+from src.esp_algorithms.smms.user_distance_index import UserDistanceIndex
+
+
+class _Solicitation:
+    """
+    One pending request for a service to move closer to its users.
+    """
+
+    __slots__ = (
+        "service",
+        "incoming_service",
+        "depth",
+        "candidates",
+        "position",
+        "distances",
+        "current_distance",
+        "server",
+        "requests",
+    )
+
+    def __init__(
+        self,
+        service: esp.Service,
+        incoming_service: esp.Service,
+        depth: int,
+        distance_index: UserDistanceIndex,
+        candidates: list[esp.EdgeServer] | None = None,
+    ):
+        self.service = service
+        self.incoming_service = incoming_service
+        self.depth = depth
+        self.distances = distance_index.average_user_distances(service)
+        """Distance from each server to the service's users, looked up once."""
+        self.candidates = (
+            candidates
+            if candidates is not None
+            else distance_index.nearest_servers(service, self.distances)
+        )
+        self.position = 0
+        self.current_distance = distance_index.distance_to(
+            self.distances, service.server
+        )
+        self.server: esp.EdgeServer | None = None
+        """Full server whose services are being asked to make room."""
+        self.requests: list[esp.Service] = []
+        """Services on `server` that still have to be asked to move."""
+
+
+class MigrationNegotiation:
+    """
+    Migration negotiations between SMMS agents during one simulation step.
+
+    A service looks for a server closer to its users. When such a server is full,
+    the services hosted there are asked to move closer to their own users first,
+    up to `max_depth` levels deep and within `budget` server evaluations by the
+    services asked to move. Once the budget runs out, no more services are asked
+    to move, but the soliciting service still tries each of its candidates. The
+    search runs on an explicit stack, and capacity checks and failed requests are
+    remembered until the next provisioning changes the servers' capacity.
+    """
+
+    def __init__(
+        self,
+        distance_index: UserDistanceIndex,
+        capacity_index: CapacityIndex,
+        max_depth: int,
+        budget: int,
+    ):
+        self.distance_index = distance_index
+        self.capacity_index = capacity_index
+        self.max_depth = max_depth
+        self.budget = budget
+        self.capacity_version = 0
+        """Incremented whenever a provisioning changes the servers' capacity."""
+        self._capacity: dict[tuple[int, int], tuple[int, bool]] = {}
+        self._failed: dict[tuple[int, int, int], int] = {}
+
+    def has_capacity(self, server: esp.EdgeServer, service: esp.Service) -> bool:
+        key = (server.id, service.id)
+        cached = self._capacity.get(key)
+        if cached is not None and cached[0] == self.capacity_version:
+            return cached[1]
+        has_capacity = self.capacity_index.may_host(
+            server, service
+        ) and server.has_capacity_to_host(service)
+        self._capacity[key] = (self.capacity_version, has_capacity)
+        return has_capacity
+
+    def provision(self, service: esp.Service, server: esp.EdgeServer) -> None:
+        service.provision(server)
+        self.capacity_index.update(server)
+        self.capacity_version += 1
+
+    def solicit(
+        self, service: esp.Service, candidates: list[esp.EdgeServer] | None = None
+    ) -> bool:
+        """
+        Try to move `service` to a server closer to its users, asking other
+        services to make room when needed. Returns whether it was provisioned.
+
+        `candidates` are the servers to try, nearest to the service's users first;
+        they are looked up in the distance index when not given.
+        """
+        budget = self.budget
+        stack = [_Solicitation(service, service, 0, self.distance_index, candidates)]
+        placed = False
+        while stack:
+            solicitation = stack[-1]
+
+            if solicitation.requests and budget <= 0:
+                solicitation.requests = []
+            if solicitation.requests:
+                requested = solicitation.requests.pop()
+                depth = solicitation.depth + 1
+                if requested.being_provisioned or self._already_failed(
+                    requested, solicitation.service, depth
+                ):
+                    continue
+                stack.append(
+                    _Solicitation(
+                        requested, solicitation.service, depth, self.distance_index
+                    )
+                )
+                continue
+
+            if solicitation.server is not None:
+                server, solicitation.server = solicitation.server, None
+                if self.has_capacity(server, solicitation.service):
+                    placed = self._finish(stack, server)
+                continue
+
+            server = self._next_candidate(solicitation)
+            if server is None:
+                placed = self._finish(stack, None)
+                continue
+            if solicitation.depth > 0:
+                if budget <= 0:
+                    # Running out of budget says nothing about later requests.
+                    placed = self._finish(stack, None, remember_failure=False)
+                    continue
+                budget -= 1
+
+            if self.has_capacity(server, solicitation.service):
+                placed = self._finish(stack, server)
+            elif solicitation.depth <= self.max_depth and budget > 0:
+                solicitation.server = server
+                excluded = (solicitation.service, solicitation.incoming_service)
+                solicitation.requests = [
+                    hosted
+                    for hosted in reversed(server.services)
+                    if hosted not in excluded and not hosted.being_provisioned
+                ]
+        return placed
+
+    def _next_candidate(self, solicitation: _Solicitation) -> esp.EdgeServer | None:
+        while solicitation.position < len(solicitation.candidates):
+            server = solicitation.candidates[solicitation.position]
+            solicitation.position += 1
+            if server == solicitation.service.server:
+                continue
+            distance = self.distance_index.distance_to(solicitation.distances, server)
+            if distance > solicitation.current_distance:
+                return None
+            return server
+        return None
+
+    def _finish(
+        self,
+        stack: list[_Solicitation],
+        server: esp.EdgeServer | None,
+        remember_failure: bool = True,
+    ) -> bool:
+        solicitation = stack.pop()
+        if server is None:
+            if not remember_failure:
+                return False
+            key = (
+                solicitation.service.id,
+                solicitation.incoming_service.id,
+                solicitation.depth,
+            )
+            self._failed[key] = self.capacity_version
+            return False
+
+        logger.debug(
+            "[Agent {}] Directing service to Server {}",
+            solicitation.service.id,
+            server.id,
+        )
+        self.provision(solicitation.service, server)
+        return True
+
+    def _already_failed(
+        self, service: esp.Service, incoming_service: esp.Service, depth: int
+    ) -> bool:
+        failed_at = self._failed.get((service.id, incoming_service.id, depth))
+        return failed_at == self.capacity_version
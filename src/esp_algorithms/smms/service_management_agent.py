@@ -3,6 +3,9 @@ from edge_sim_py.component_manager import ComponentManager
 from loguru import logger
 from mesa import Agent
 
+from src.esp_algorithms.smms.migration_negotiation import MigrationNegotiation
+from src.esp_algorithms.smms.user_distance_index import UserDistanceIndex
+
 
 class ServiceManagementAgent(ComponentManager, Agent):
     _instances = []
@@ -11,6 +14,12 @@ class ServiceManagementAgent(ComponentManager, Agent):
     _object_count = 0
     """Counter to assign unique IDs to each `ServiceManagementAgent` instance."""
 
+    distance_index: UserDistanceIndex | None = None
+    """Cache of the average distance from each server to each agent's users."""
+
+    negotiation: MigrationNegotiation | None = None
+    """Migration negotiations of the current step."""
+
     def __init__(self, service: esp.Service):
         self.service: esp.Service = service
 
@@ -21,30 +30,53 @@ class ServiceManagementAgent(ComponentManager, Agent):
         """Unique identifier for the service."""
 
     def step(self) -> None:
+        self.resolve(self.propose())
+
+    def propose(self) -> list[esp.EdgeServer] | None:
+        """
+        Servers this agent would like to move to, nearest to its users first.
+
+        Only reads shared state, so every agent's proposal can be computed before
+        any of them acts.
+        """
+        if not self.proposes():
+            return None
+        return self.distance_index.nearest_servers(self.service)
+
+    def proposes(self) -> bool:
+        """
+        Whether the agent's proposal ranks the servers by distance to its users.
+        """
+        return not self._service_is_already_hosted_or_deploying() and self._has_users()
+
+    def resolve(self, proposal: list[esp.EdgeServer] | None) -> bool:
+        """
+        Act on a proposal made earlier in the step, checking it against the
+        servers' current capacity. Returns whether the agent had to act.
+        """
         if self._service_is_already_hosted_or_deploying():
-            logger.info(f"[Agent {self.id}] No actions")
-            return
-        logger.info(f"[Agent {self.id}] Finding host for service {self.service.id}")
+            logger.debug("[Agent {}] No actions", self.id)
+            return False
+        logger.debug("[Agent {}] Finding host for service {}", self.id, self.service.id)
 
-        servers: list[esp.EdgeServer] = esp.EdgeServer.all()
-        if not self.service.users and not self.service.application.users:
-            return self._place_self_in_the_first_available_server(servers)
-        self._place_self_near_own_services_users(servers)
+        if not self._has_users():
+            self._place_self_in_the_first_available_server()
+        else:
+            self._place_self_near_own_services_users(proposal)
+        return True
 
-    def _place_self_in_the_first_available_server(
-        self, servers: list[esp.EdgeServer]
-    ) -> None:
-        available_server: esp.EdgeServer = self._find_available_server(servers)
-        self.service.provision(available_server)
+    def _place_self_in_the_first_available_server(self) -> None:
+        available_server: esp.EdgeServer = self._find_available_server()
+        self.negotiation.provision(self.service, available_server)
 
     def _service_is_already_hosted_or_deploying(self):
         return self.service.server is not None or self.service.being_provisioned
 
-    def _find_available_server(self, servers: list[esp.EdgeServer]) -> esp.EdgeServer:
-        for server in servers:
-            if server.has_capacity_to_host(self.service):
-                return server
-        return None
+    def _has_users(self) -> bool:
+        return bool(self.service.users or self.service.application.users)
+
+    def _find_available_server(self) -> esp.EdgeServer | None:
+        return self.negotiation.capacity_index.first_fit(self.service)
 
     @property
     def coordinates(self) -> tuple[int, int] | None:
@@ -53,50 +85,12 @@ class ServiceManagementAgent(ComponentManager, Agent):
             return None
         return self.service.server.coordinates
 
-    def _place_self_near_own_services_users(self, servers: list[esp.EdgeServer]):
-        self.migration_solicitation(incoming_service=self.service, servers=servers)
-
-    def _euclidian_distance(
-        self, coord1: tuple[int, int] | None, coord2: tuple[int, int] | None
-    ) -> float:
-        if coord1 is None or coord2 is None:
-            return float("inf")
-        return ((coord1[0] - coord2[0]) ** 2 + (coord1[1] - coord2[1]) ** 2) ** 0.5
-
-    def _average_user_distance(self, server: esp.EdgeServer | None) -> float:
-        if not server:
-            return float("inf")
-        distances = [
-            self._euclidian_distance(user.coordinates, server.coordinates)
-            for user in set(self.service.users + self.service.application.users)
-        ]
-        distances = list(filter(lambda value: value != float("inf"), distances))
-        if not distances:
-            return float("inf")
-        return sum(distances) / len(distances)
+    def _place_self_near_own_services_users(
+        self, candidates: list[esp.EdgeServer] | None = None
+    ):
+        self.migration_solicitation(candidates)
 
     def migration_solicitation(
-        self, incoming_service, servers: list[esp.EdgeServer], depth=0
-    ):
-        servers.sort(key=self._average_user_distance)
-
-        current_distance_to_users = self._average_user_distance(self.service.server)
-        for server in servers:
-            if server == self.service.server:
-                continue
-            if self._average_user_distance(server) > current_distance_to_users:
-                break
-            if not server.has_capacity_to_host(self.service) and depth <= 2:
-                for service in server.services:
-                    if service != self.service and service != incoming_service:
-                        service.agent.migration_solicitation(
-                            incoming_service=self.service,
-                            servers=servers,
-                            depth=depth + 1,
-                        )
-            if server.has_capacity_to_host(self.service):
-                logger.info(
-                    f"[Agent {self.id}] Directing service to Server {server.id}"
-                )
-                self.service.provision(server)
-                return
+        self, candidates: list[esp.EdgeServer] | None = None
+    ) -> bool:
+        return self.negotiation.solicit(self.service, candidates)
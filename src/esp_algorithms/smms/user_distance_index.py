@@ -0,0 +1,138 @@
+from concurrent.futures import Executor
+
+import edge_sim_py as esp
+import numpy as np
+
+
+class UserDistanceIndex:
+    """
+    Average distance from each edge server to the users of a service.
+
+    Server coordinates are kept in a NumPy array, so the distances from every server
+    to a service's users are computed in one vectorized pass. Results are cached per
+    service and recomputed only when one of its users moves.
+    """
+
+    def __init__(self, servers: list[esp.EdgeServer], chunk_size: int = 256):
+        self.servers: list[esp.EdgeServer] = list(servers)
+        self.chunk_size = chunk_size
+        """Services whose distances are computed together by `rank`."""
+        self._positions: dict[int, int] = {
+            server.id: position for position, server in enumerate(self.servers)
+        }
+        self._coordinates = np.array(
+            [
+                server.coordinates if server.coordinates is not None else (np.nan,) * 2
+                for server in self.servers
+            ],
+            dtype=float,
+        ).reshape(-1, 2)
+        self._cache: dict[int, tuple[tuple, np.ndarray]] = {}
+        self._rankings: dict[int, tuple[np.ndarray, list[esp.EdgeServer]]] = {}
+
+    def average_user_distances(self, service: esp.Service) -> np.ndarray:
+        """
+        Average distance from every server (in index order) to the service's users.
+        Servers without coordinates, or services without located users, get `inf`.
+        """
+        user_coordinates = self._user_coordinates(service)
+        cached = self._cache.get(service.id)
+        if cached is not None and cached[0] == user_coordinates:
+            return cached[1]
+
+        if not user_coordinates:
+            distances = np.full(len(self.servers), np.inf)
+        else:
+            distances = self._distances(np.array([user_coordinates], dtype=float))[0]
+
+        self._cache[service.id] = (user_coordinates, distances)
+        return distances
+
+    def rank(self, services: list[esp.Service], executor: Executor | None = None):
+        """
+        Compute the distances and server rankings of `services` in batches, so
+        that `nearest_servers` finds them cached. Services with the same number of
+        users are batched together, `chunk_size` at a time, and the batches are
+        spread over `executor` when given: NumPy releases the GIL while it works
+        on them. Each service gets the same distances and ranking it would get on
+        its own.
+        """
+        batches: dict[int, list[tuple[esp.Service, tuple]]] = {}
+        for service in services:
+            user_coordinates = self._user_coordinates(service)
+            cached = self._cache.get(service.id)
+            if not user_coordinates or (
+                cached is not None and cached[0] == user_coordinates
+            ):
+                continue
+            batches.setdefault(len(user_coordinates), []).append(
+                (service, user_coordinates)
+            )
+
+        chunks = [
+            batch[start : start + self.chunk_size]
+            for batch in batches.values()
+            for start in range(0, len(batch), self.chunk_size)
+        ]
+        users = [
+            np.array([coordinates for _, coordinates in chunk], dtype=float)
+            for chunk in chunks
+        ]
+        mapped = executor.map if executor is not None else map
+        for chunk, (distances, rankings) in zip(chunks, mapped(self._rank, users)):
+            for (service, user_coordinates), row, ranking in zip(
+                chunk, distances, rankings
+            ):
+                self._cache[service.id] = (user_coordinates, row)
+                servers = [self.servers[position] for position in ranking.tolist()]
+                self._rankings[service.id] = (row, servers)
+
+    def distance_to(
+        self, distances: np.ndarray, server: esp.EdgeServer | None
+    ) -> float:
+        """
+        The distance to `server` among `distances`, as returned by
+        `average_user_distances`.
+        """
+        if server is None or server.id not in self._positions:
+            return float("inf")
+        return distances[self._positions[server.id]].item()
+
+    def nearest_servers(
+        self, service: esp.Service, distances: np.ndarray | None = None
+    ) -> list[esp.EdgeServer]:
+        """
+        Servers sorted by their average distance to the service's users, given in
+        `distances` when already looked up. The ranking is cached alongside the
+        distances it was computed from, so callers must not modify the returned
+        list.
+        """
+        if distances is None:
+            distances = self.average_user_distances(service)
+        cached = self._rankings.get(service.id)
+        if cached is not None and cached[0] is distances:
+            return cached[1]
+
+        ranking = np.argsort(distances, kind="stable")
+        servers = [self.servers[position] for position in ranking.tolist()]
+        self._rankings[service.id] = (distances, servers)
+        return servers
+
+    @staticmethod
+    def _user_coordinates(service: esp.Service) -> tuple:
+        users = set(service.users + service.application.users)
+        return tuple(user.coordinates for user in users if user.coordinates is not None)
+
+    def _distances(self, users: np.ndarray) -> np.ndarray:
+        """
+        Average distance from every server to each row of users, for `users` of
+        shape (services, users per service, 2).
+        """
+        deltas = self._coordinates[np.newaxis, :, np.newaxis, :] - users[:, np.newaxis]
+        distances = np.sqrt((deltas**2).sum(axis=3)).mean(axis=2)
+        distances[np.isnan(distances)] = np.inf
+        return distances
+
+    def _rank(self, users: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        distances = self._distances(users)
+        return distances, np.argsort(distances, axis=1, kind="stable")
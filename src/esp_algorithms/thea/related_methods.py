@@ -1,6 +1,10 @@
 # flake8: noqa
 
 import edge_sim_py as esp
+import networkx as nx
+import numpy as np
+
+from src.utils.profiler import profiled
 
 
 def get_application_delay_score(app: object) -> float:
@@ -19,12 +23,10 @@ def get_application_delay_score(app: object) -> float:
 
     edge_servers_that_dont_violate_delay_sla = 0
     for edge_server in esp.EdgeServer.all():
-        topology = user_switch.model.topology
-        path = find_shortest_path(
+        delay = calculate_path_delay(
             origin_network_switch=user_switch,
             target_network_switch=edge_server.network_switch,
         )
-        delay = topology.calculate_path_delay(path=path)
         if delay <= delay_sla:
             edge_servers_that_dont_violate_delay_sla += 1
 
@@ -40,40 +42,31 @@ def get_application_delay_score(app: object) -> float:
     return app_delay_score
 
 
-def find_shortest_path(
-    origin_network_switch: object, target_network_switch: object
-) -> int:
-    import networkx as nx
-
-    """Finds the shortest path (delay used as weight) between two network switches (origin and target).
+@profiled("thea.get_delay_matrix")
+def get_delay_matrix(topology: object) -> np.ndarray:
+    """Gets the delay of the shortest path between every pair of network switches, indexed by switch ID. The matrix is
+    computed once per topology (one Dijkstra run per switch) and memoized on the topology object.
 
     Args:
-        origin_network_switch (object): Origin network switch.
-        target_network_switch (object): Target network switch.
+        topology (object): Network topology.
 
     Returns:
-        path (list): Shortest path between the origin and target network switches.
+        delay_matrix (np.ndarray): Matrix where delay_matrix[origin.id, target.id] is the delay between both switches.
     """
-    topology = origin_network_switch.model.topology
-    path = []
+    if not hasattr(topology, "delay_matrix"):
+        switches = list(topology.nodes())
+        size = max((switch.id for switch in switches), default=0) + 1
+        delay_matrix = np.full((size, size), np.inf)
 
-    if not hasattr(topology, "delay_shortest_paths"):
-        topology.delay_shortest_paths = {}
+        for origin in switches:
+            for target, delay in nx.single_source_dijkstra_path_length(
+                G=topology, source=origin, weight="delay"
+            ).items():
+                delay_matrix[origin.id, target.id] = delay
 
-    key = (origin_network_switch, target_network_switch)
+        topology.delay_matrix = delay_matrix
 
-    if key in topology.delay_shortest_paths.keys():
-        path = topology.delay_shortest_paths[key]
-    else:
-        path = nx.shortest_path(
-            G=topology,
-            source=origin_network_switch,
-            target=target_network_switch,
-            weight="delay",
-        )
-        topology.delay_shortest_paths[key] = path
-
-    return path
+    return topology.delay_matrix
 
 
 def normalize_cpu_and_memory(cpu, memory) -> float:
@@ -170,14 +163,9 @@ def calculate_path_delay(
     Returns:
         delay (int): Delay between the origin and target network switches.
     """
-    topology = origin_network_switch.model.topology
-
-    path = find_shortest_path(
-        origin_network_switch=origin_network_switch,
-        target_network_switch=target_network_switch,
-    )
+    delay_matrix = get_delay_matrix(topology=origin_network_switch.model.topology)
 
-    delay = topology.calculate_path_delay(path=path)
+    delay = delay_matrix[origin_network_switch.id, target_network_switch.id].item()
 
     return delay
 
@@ -220,12 +208,273 @@ def get_application_privacy_score(app: object):
     return app_privacy_score
 
 
-def get_host_candidates(user: object, service: object) -> list:
-    """Get list of host candidates for hosting services of a given user.
+def get_edge_server_attributes(topology: object) -> dict:
+    """Gets the static attributes of every edge server as NumPy arrays (ordered as in EdgeServer.all()). The arrays are
+    computed once per topology and memoized on the topology object.
+
+    Args:
+        topology (object): Network topology.
+
+    Returns:
+        edge_server_attributes (dict): Dictionary with the edge servers and their static attributes.
+    """
+    if not hasattr(topology, "edge_server_attributes"):
+        edge_servers = esp.EdgeServer.all()
+        provider_names = sorted(
+            {str(edge_server.infrastructure_provider) for edge_server in edge_servers}
+        )
+        topology.edge_server_attributes = {
+            "object": edge_servers,
+            "switch_id": np.array(
+                [edge_server.network_switch.id for edge_server in edge_servers],
+                dtype=int,
+            ),
+            "provider_names": provider_names,
+            "provider_index": np.array(
+                [
+                    provider_names.index(str(edge_server.infrastructure_provider))
+                    for edge_server in edge_servers
+                ],
+                dtype=int,
+            ),
+            "static_power_consumption": np.array(
+                [
+                    edge_server.power_model_parameters["static_power_percentage"]
+                    for edge_server in edge_servers
+                ],
+                dtype=float,
+            ),
+            "consumption_per_core": np.array(
+                [
+                    edge_server.power_model_parameters["max_power_consumption"]
+                    / edge_server.cpu
+                    for edge_server in edge_servers
+                ],
+                dtype=float,
+            ),
+        }
+
+    return topology.edge_server_attributes
+
+
+def get_trust_on_edge_servers(user: object, edge_server_attributes: dict) -> np.ndarray:
+    """Gets how much a user trusts the infrastructure provider of each edge server.
+
     Args:
         user (object): User object.
+        edge_server_attributes (dict): Static attributes of the edge servers.
+
+    Returns:
+        trust (np.ndarray): Trust degree of the user on each edge server.
+    """
+    trust_per_provider = np.array(
+        [
+            user.providers_trust[provider]
+            for provider in edge_server_attributes["provider_names"]
+        ],
+        dtype=float,
+    )
+    return trust_per_provider[edge_server_attributes["provider_index"]]
+
+
+def get_affected_service_contribution(
+    service: object, edge_server_attributes: dict, delay_matrix: np.ndarray
+):
+    """Gets how much an unplaced service adds to the affected services cost of each edge server. A service only affects
+    servers whose infrastructure provider its user trusts enough, and the closer the server is to the user, the
+    higher the cost.
+
+    Args:
+        service (object): Unplaced service.
+        edge_server_attributes (dict): Static attributes of the edge servers.
+        delay_matrix (np.ndarray): Delay between every pair of network switches.
+
     Returns:
-        host_candidates (list): List of host candidates.
+        contribution (tuple): ID of the switch the service's user is connected to and the cost added to each server.
+    """
+    affected_user = service.application.users[0]
+    user_switch_id = affected_user.base_station.network_switch.id
+
+    relies_on_the_edge_server = (
+        get_trust_on_edge_servers(
+            user=affected_user, edge_server_attributes=edge_server_attributes
+        )
+        >= service.privacy_requirement
+    )
+
+    distance_to_affected_user = delay_matrix[
+        user_switch_id, edge_server_attributes["switch_id"]
+    ]
+    distance_cost = 1 / np.maximum(1, distance_to_affected_user)
+
+    return user_switch_id, np.where(relies_on_the_edge_server, distance_cost, 0)
+
+
+def get_affected_services_index(topology: object, current_step: int) -> dict:
+    """Gets the index of unplaced services and the affected services cost they add to each edge server. The index is
+    built once per topology and then kept up to date incrementally: only services that got placed, or whose user
+    moved to another switch, have their contribution removed or recomputed. It is synchronized once per simulation
+    step, and within a step THEA removes each service it places with remove_from_affected_services_index.
+
+    Args:
+        topology (object): Network topology.
+        current_step (int): Current simulation step.
+
+    Returns:
+        affected_services_index (dict): Per-service contributions and their sum ("cost") for each edge server.
+    """
+    delay_matrix = get_delay_matrix(topology=topology)
+    edge_servers = get_edge_server_attributes(topology=topology)
+
+    if not hasattr(topology, "affected_services_index"):
+        index = {
+            "contributions": {},
+            "cost": np.zeros(len(edge_servers["object"])),
+            "synchronized_at": current_step,
+        }
+        for service in esp.Service.all():
+            if service.server is None:
+                contribution = get_affected_service_contribution(
+                    service, edge_servers, delay_matrix
+                )
+                index["contributions"][service] = contribution
+                index["cost"] += contribution[1]
+        topology.affected_services_index = index
+
+    index = topology.affected_services_index
+    if index["synchronized_at"] != current_step:
+        for service, (user_switch_id, cost) in list(index["contributions"].items()):
+            user_switch = service.application.users[0].base_station.network_switch
+            if service.server is not None:
+                index["cost"] -= cost
+                del index["contributions"][service]
+            elif user_switch.id != user_switch_id:
+                index["cost"] -= cost
+                contribution = get_affected_service_contribution(
+                    service, edge_servers, delay_matrix
+                )
+                index["contributions"][service] = contribution
+                index["cost"] += contribution[1]
+        index["synchronized_at"] = current_step
+
+    return index
+
+
+def remove_from_affected_services_index(topology: object, service: object):
+    """Removes a service that just got placed from the affected services index, so that the services provisioned
+    after it in the same step no longer count it as affected.
+
+    Args:
+        topology (object): Network topology.
+        service (object): Service that got placed.
+    """
+    index = getattr(topology, "affected_services_index", None)
+    if index is None or service not in index["contributions"]:
+        return
+    _, cost = index["contributions"].pop(service)
+    index["cost"] -= cost
+
+
+def get_application_fingerprint(app: object) -> tuple:
+    """Gets the inputs the application's delay and privacy scores depend on and that can change during a simulation:
+    the switch its user is connected to, its delay SLA and its services' demands and privacy requirements.
+
+    Args:
+        app (object): Application.
+
+    Returns:
+        fingerprint (tuple): Application's fingerprint.
+    """
+    user = app.users[0]
+    return (
+        user.base_station.network_switch.id,
+        user.delay_slas[str(app.id)],
+        tuple(
+            (service.cpu_demand, service.memory_demand, service.privacy_requirement)
+            for service in app.services
+        ),
+    )
+
+
+def rank_applications(apps: list) -> list:
+    """Sorts applications by the sum of their min-max normalized delay and privacy scores, in descending order.
+
+    Scores are memoized per application on the topology object and only recalculated when the application's
+    fingerprint changes. The ranking itself is reused while no fingerprint has changed.
+
+    Args:
+        apps (list): Applications to be ranked.
+
+    Returns:
+        apps (list): Applications sorted from the highest to the lowest priority.
+    """
+    if not apps:
+        return []
+
+    topology = apps[0].users[0].base_station.network_switch.model.topology
+    if not hasattr(topology, "application_scores"):
+        topology.application_scores = {}
+        topology.application_ranking = (None, None)
+
+    fingerprints = [get_application_fingerprint(app=app) for app in apps]
+    if topology.application_ranking[0] == (apps, fingerprints):
+        return topology.application_ranking[1]
+
+    apps_metadata = []
+    for app, fingerprint in zip(apps, fingerprints):
+        memoized = topology.application_scores.get(app)
+        if memoized is None or memoized[0] != fingerprint:
+            memoized = (
+                fingerprint,
+                get_application_delay_score(app=app),
+                get_application_privacy_score(app=app),
+            )
+            topology.application_scores[app] = memoized
+
+        apps_metadata.append(
+            {
+                "object": app,
+                "number_of_services": len(app.services),
+                "delay_sla": fingerprint[1],
+                "delay_score": memoized[1],
+                "privacy_score": memoized[2],
+            }
+        )
+
+    min_and_max = find_minimum_and_maximum(metadata=apps_metadata)
+    apps_metadata = sorted(
+        apps_metadata,
+        key=lambda app: (
+            get_norm(
+                metadata=app,
+                attr_name="delay_score",
+                min=min_and_max["minimum"],
+                max=min_and_max["maximum"],
+            )
+            + get_norm(
+                metadata=app,
+                attr_name="privacy_score",
+                min=min_and_max["minimum"],
+                max=min_and_max["maximum"],
+            )
+        ),
+        reverse=True,
+    )
+
+    ranking = [app_metadata["object"] for app_metadata in apps_metadata]
+    topology.application_ranking = ((list(apps), fingerprints), ranking)
+    return ranking
+
+
+@profiled("thea.get_host_candidates")
+def get_host_candidates(user: object, service: object) -> dict:
+    """Get the attributes of every edge server as a host candidate for a service of a given user. Attributes are
+    computed for all edge servers at once, as NumPy arrays ordered as in EdgeServer.all().
+    Args:
+        user (object): User object.
+        service (object): Service being provisioned.
+    Returns:
+        host_candidates (dict): Dictionary with the edge servers ("object") and one array per attribute.
     """
     chain = list([service.application.users[0]] + service.application.services)
     prev_item = chain[chain.index(service) - 1]
@@ -239,75 +488,80 @@ def get_host_candidates(user: object, service: object) -> list:
         if user.delays[str(service.application.id)] is not None
         else 0
     )
+    is_last_service = service == service.application.services[-1]
+
+    model = switch_of_previous_item_in_chain.model
+    topology = model.topology
+    delay_matrix = get_delay_matrix(topology=topology)
+    edge_servers = get_edge_server_attributes(topology=topology)
+    edge_server_switches = edge_servers["switch_id"]
+
+    additional_delay = delay_matrix[
+        switch_of_previous_item_in_chain.id, edge_server_switches
+    ]
+    overall_delay = app_delay + additional_delay
+    delay_cost = (
+        additional_delay if is_last_service else np.zeros(len(additional_delay))
+    )
 
-    host_candidates = []
-
-    for edge_server in esp.EdgeServer.all():
-        additional_delay = calculate_path_delay(
-            origin_network_switch=switch_of_previous_item_in_chain,
-            target_network_switch=edge_server.network_switch,
-        )
-        overall_delay = app_delay + additional_delay
-        delay_cost = (
-            additional_delay if service == service.application.services[-1] else 0
-        )
-
-        violates_privacy_sla = (
-            1
-            if user.providers_trust[str(edge_server.infrastructure_provider)]
-            < service.privacy_requirement
-            else 0
-        )
-        violates_delay_sla = (
-            1 if overall_delay > user.delay_slas[str(service.application.id)] else 0
-        )
-        sla_violations = violates_delay_sla + violates_privacy_sla
-
-        static_power_consumption = edge_server.power_model_parameters[
-            "static_power_percentage"
-        ]
-        consumption_per_core = (
-            edge_server.power_model_parameters["max_power_consumption"]
-            / edge_server.cpu
-        )
-        power_consumption = consumption_per_core + static_power_consumption * (
-            1 - sign(edge_server.cpu_demand)
+    violates_privacy_sla = (
+        get_trust_on_edge_servers(user=user, edge_server_attributes=edge_servers)
+        < service.privacy_requirement
+    ).astype(int)
+    violates_delay_sla = (
+        overall_delay > user.delay_slas[str(service.application.id)]
+    ).astype(int)
+    sla_violations = violates_delay_sla + violates_privacy_sla
+
+    cpu_demand = np.array(
+        [edge_server.cpu_demand for edge_server in edge_servers["object"]], dtype=float
+    )
+    power_consumption = edge_servers["consumption_per_core"] + edge_servers[
+        "static_power_consumption"
+    ] * (1 - np.sign(cpu_demand))
+
+    affected_services_cost = np.zeros(len(edge_servers["object"]))
+    if is_last_service:
+        affected_services_index = get_affected_services_index(
+            topology=topology, current_step=model.schedule.steps
         )
+        contributions = affected_services_index["contributions"]
+        affected_services_cost = affected_services_index["cost"].copy()
+        if service in contributions:
+            affected_services_cost -= contributions[service][1]
+        # Adding and removing contributions leaves rounding residue behind, which the min-max normalization would
+        # blow up into a ranking whenever every server actually has the same cost.
+        affected_services_cost = np.round(affected_services_cost, decimals=9)
+
+    return {
+        "object": edge_servers["object"],
+        "sla_violations": sla_violations,
+        "affected_services_cost": affected_services_cost,
+        "power_consumption": power_consumption,
+        "delay_cost": delay_cost,
+    }
 
-        affected_services = []
-        for affected_service in esp.Service.all():
-            affected_user = affected_service.application.users[0]
-            trust_on_the_edge_server = affected_user.providers_trust[
-                str(edge_server.infrastructure_provider)
-            ]
-            relies_on_the_edge_server = (
-                trust_on_the_edge_server >= affected_service.privacy_requirement
-            )
 
-            if (
-                affected_service.server is None
-                and affected_service != service
-                and relies_on_the_edge_server
-            ):
-                distance_to_affected_user = calculate_path_delay(
-                    origin_network_switch=affected_user.base_station.network_switch,
-                    target_network_switch=edge_server.network_switch,
-                )
-                distance_cost = 1 / max(1, distance_to_affected_user)
-                affected_services.append(distance_cost)
+def rank_host_candidates(host_candidates: dict) -> list:
+    """Sorts host candidates by the number of SLA violations and, as a tiebreaker, by the sum of their min-max
+    normalized affected services cost, power consumption and delay cost.
 
-        affected_services_cost = (
-            sum(affected_services) if service == service.application.services[-1] else 0
-        )
+    Args:
+        host_candidates (dict): Host candidates, as returned by get_host_candidates.
 
-        host_candidates.append(
-            {
-                "object": edge_server,
-                "sla_violations": sla_violations,
-                "affected_services_cost": affected_services_cost,
-                "power_consumption": power_consumption,
-                "delay_cost": delay_cost,
-            }
+    Returns:
+        edge_servers (list): Edge servers sorted from the best to the worst host candidate.
+    """
+    normalized_costs = [
+        min_max_norm(
+            x=host_candidates[attr_name],
+            min=host_candidates[attr_name].min(),
+            max=host_candidates[attr_name].max(),
         )
+        for attr_name in ["affected_services_cost", "power_consumption", "delay_cost"]
+    ]
+    costs = normalized_costs[0] + normalized_costs[1] + normalized_costs[2]
+    costs = np.broadcast_to(costs, host_candidates["sla_violations"].shape)
 
-    return host_candidates
+    ranking = np.lexsort((costs, host_candidates["sla_violations"]))
+    return [host_candidates["object"][index] for index in ranking]
@@ -1,6 +1,8 @@
+from uuid import UUID
+
 from fastapi import HTTPException, status
 
-from src.utils.enums import SimulationInputAlgorithm
+from src.utils.enums import SimulationInputAlgorithm, SimulationJobStatus
 
 
 class AlgorithmException(HTTPException):
@@ -10,3 +12,61 @@ class AlgorithmException(HTTPException):
             detail=f"There was a problem executing {algorithm}. "
             "Please validate your input and try again.",
         )
+
+
+class JobNotFoundException(HTTPException):
+    def __init__(self, job_id: UUID):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Simulation job {job_id} was not found.",
+        )
+
+
+class JobNotFinishedException(HTTPException):
+    def __init__(self, job_id: UUID, job_status: SimulationJobStatus):
+        super().__init__(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Simulation job {job_id} is still {job_status}. "
+            "Please try again later.",
+        )
+
+
+class JobFailedException(HTTPException):
+    def __init__(self, job_id: UUID, error: str | None):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Simulation job {job_id} failed: {error}",
+        )
+
+
+class ScenarioDownloadException(HTTPException):
+    def __init__(self, url: str, reason: str):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not load the scenario from {url} ({reason}). "
+            "Please validate your input and try again.",
+        )
+
+
+class ScenarioTooLargeException(HTTPException):
+    def __init__(self, url: str, max_bytes: int):
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"The scenario at {url} is larger than {max_bytes} bytes.",
+        )
+
+
+class BatchTooLargeException(HTTPException):
+    def __init__(self, runs: int, max_runs: int):
+        super().__init__(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The batch has {runs} runs, but at most {max_runs} are allowed.",
+        )
+
+
+class ProfileNotFoundException(HTTPException):
+    def __init__(self, profile_id: UUID):
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Simulation profile {profile_id} was not found.",
+        )
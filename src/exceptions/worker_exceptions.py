@@ -0,0 +1,10 @@
+class SimulationWorkerError(Exception):
+    """
+    Raised when a job fails inside a simulation worker or the worker dies mid-job.
+    """
+
+
+class SimulationCancelledError(SimulationWorkerError):
+    """
+    Raised inside a simulation worker when the client streaming the job cancels it.
+    """
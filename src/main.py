@@ -3,11 +3,17 @@ import multiprocessing
 import uvicorn
 
 from src.configs.env import Config
+from src.services.job_service import JobService
+from src.services.logging_service import LoggingService
+from src.services.metrics_service import MetricsService
 
 
 def main() -> None:
     """Entrypoint of the application."""
     multiprocessing.set_start_method("spawn")
+    MetricsService.clear()
+    JobService.clear()
+    LoggingService.release_claimed_spool()
     uvicorn.run(
         "src.app:get_app",
         workers=Config.WORKERS_COUNT,
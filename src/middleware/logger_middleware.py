@@ -1,51 +1,135 @@
 import contextvars
+import hashlib
+import random
 import time
 from uuid import uuid4
 
-from fastapi import Request, Response
-from fastapi.concurrency import iterate_in_threadpool
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.configs.env import Config
 
 REQUEST_UUID = contextvars.ContextVar("request_uuid", default=None)
 
 
-class LoggerMiddleware(BaseHTTPMiddleware):
+class _BodyDigest:
+    """
+    Size, SHA-256 and first bytes of a body, fed one chunk at a time.
+    """
+
+    def __init__(self, preview_bytes: int):
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._preview = bytearray()
+        self._preview_bytes = preview_bytes
+
+    def update(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        self._sha256.update(chunk)
+        missing = self._preview_bytes - len(self._preview)
+        if missing > 0:
+            self._preview.extend(chunk[:missing])
+
+    def __str__(self) -> str:
+        preview = self._preview.decode(errors="replace")
+        if self.size > len(self._preview):
+            preview += "..."
+        return (
+            f"size={self.size}; sha256={self._sha256.hexdigest()}; preview={preview!r}"
+        )
+
+
+class LoggerMiddleware:
+    """
+    Logs every sampled request and its response without buffering either body:
+    chunks are hashed and counted as they pass through, and only their first
+    `preview_bytes` bytes are kept for the log.
+
+    Requests are sampled at `sample_rate`, or at the rate of the longest path
+    prefix in `route_sample_rates`, given as `"/prefix=rate,/other=rate"`. Every
+    request gets a `REQUEST_UUID`, sampled or not.
+    """
+
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         logger,
+        sample_rate: float = Config.LOG_REQUEST_SAMPLE_RATE,
+        route_sample_rates: str = Config.LOG_REQUEST_ROUTE_SAMPLE_RATES,
+        preview_bytes: int = Config.LOG_BODY_PREVIEW_BYTES,
     ):
-        super().__init__(app)
+        self.app = app
         self.logger = logger
+        self.sample_rate = sample_rate
+        self.route_sample_rates = self._parse_sample_rates(route_sample_rates)
+        self.preview_bytes = preview_bytes
 
-    async def dispatch(self, request: Request, call_next):
-        uuid = uuid4()
-        REQUEST_UUID.set(uuid)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        self.logger.warning(
-            f"Start request path={request.url.path}; method={request.method}; "
-            f"headers={await request.body()}"
-        )
-        start_time = time.time()
+        REQUEST_UUID.set(uuid4())
+        path = scope["path"]
+        if random.random() >= self._sample_rate(path):
+            await self.app(scope, receive, send)
+            return
 
-        response: Response = await call_next(request)
+        request_body = _BodyDigest(self.preview_bytes)
+        response_body = _BodyDigest(self.preview_bytes)
+        status_code = None
 
-        process_time = (time.time() - start_time) * 1000
-        formatted_process_time = "{0:.2f}".format(process_time)
+        async def logged_receive() -> Message:
+            message = await receive()
+            if message["type"] == "http.request":
+                request_body.update(message.get("body", b""))
+            return message
 
-        if request.url.path in ["/docs", "/openapi.json"]:
-            self.logger.warning(
-                f"Request completed in {formatted_process_time}ms; "
-                f"Status Code={response.status_code};"
-            )
-            return response
+        async def logged_send(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_body.update(message.get("body", b""))
+            await send(message)
 
-        res_body = [section async for section in response.body_iterator]
-        response.body_iterator = iterate_in_threadpool(iter(res_body))
-        res_body = res_body[0].decode()
+        self.logger.warning(
+            f"Start request path={path}; method={scope['method']}; "
+            f"query={scope['query_string'].decode(errors='replace')}"
+        )
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, logged_receive, logged_send)
+        except Exception:
+            self.logger.error(
+                f"Request failed after {self._elapsed_ms(start_time)}ms; "
+                f"request body: {request_body}"
+            )
+            raise
 
         self.logger.warning(
-            f"Request completed in {formatted_process_time}ms; "
-            f"Status Code={response.status_code}; body={res_body};"
+            f"Request completed in {self._elapsed_ms(start_time)}ms; "
+            f"Status Code={status_code}; request body: {request_body}; "
+            f"response body: {response_body};"
         )
-        return response
+
+    def _sample_rate(self, path: str) -> float:
+        matches = [
+            prefix for prefix in self.route_sample_rates if path.startswith(prefix)
+        ]
+        if not matches:
+            return self.sample_rate
+        return self.route_sample_rates[max(matches, key=len)]
+
+    @staticmethod
+    def _elapsed_ms(start_time: float) -> str:
+        return "{0:.2f}".format((time.perf_counter() - start_time) * 1000)
+
+    @staticmethod
+    def _parse_sample_rates(route_sample_rates: str) -> dict[str, float]:
+        rates = {}
+        for entry in route_sample_rates.split(","):
+            if not entry.strip():
+                continue
+            prefix, rate = entry.rsplit("=", 1)
+            rates[prefix.strip()] = float(rate)
+        return rates
@@ -0,0 +1,33 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, HttpUrl
+
+from src.configs.env import Config
+from src.schemas.simulation_schema import ServiceState
+from src.utils.enums import SimulationInputAlgorithm
+
+
+class SimulationBatchInput(BaseModel):
+    url_or_json: HttpUrl | dict
+    algorithms: List[SimulationInputAlgorithm] = Field(min_length=1)
+    seeds: List[int] = Field(default=[Config.SIMULATION_SEED], min_length=1)
+    include_results: bool = False
+
+
+class SimulationRunSummary(BaseModel):
+    steps: int
+    services: int
+    placed_services: int
+    all_placed_at_step: Optional[int] = None
+
+
+class SimulationBatchRun(BaseModel):
+    algorithm: SimulationInputAlgorithm
+    seed: int
+    summary: Optional[SimulationRunSummary] = None
+    Service: Optional[List[ServiceState]] = None
+    error: Optional[str] = None
+
+
+class SimulationBatchOutput(BaseModel):
+    runs: List[SimulationBatchRun]
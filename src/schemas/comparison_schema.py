@@ -0,0 +1,34 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, HttpUrl
+
+from src.configs.env import Config
+from src.schemas.batch_schema import SimulationRunSummary
+from src.schemas.simulation_schema import ServiceState
+from src.utils.enums import SimulationInputAlgorithm
+
+
+class SimulationComparisonInput(BaseModel):
+    url_or_json: HttpUrl | dict
+    algorithms: List[SimulationInputAlgorithm] = Field(min_length=1)
+    seed: int = Config.SIMULATION_SEED
+    include_results: bool = False
+
+
+class SimulationSummaryDelta(BaseModel):
+    steps: int
+    placed_services: int
+    all_placed_at_step: Optional[int] = None
+
+
+class SimulationComparisonRun(BaseModel):
+    algorithm: SimulationInputAlgorithm
+    summary: Optional[SimulationRunSummary] = None
+    delta: Optional[SimulationSummaryDelta] = None
+    Service: Optional[List[ServiceState]] = None
+    error: Optional[str] = None
+
+
+class SimulationComparisonOutput(BaseModel):
+    baseline: SimulationInputAlgorithm
+    runs: List[SimulationComparisonRun]
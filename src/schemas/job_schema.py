@@ -0,0 +1,14 @@
+from typing import Optional
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from src.utils.enums import SimulationInputAlgorithm, SimulationJobStatus
+
+
+class SimulationJob(BaseModel):
+    id: UUID
+    algorithm: SimulationInputAlgorithm
+    status: SimulationJobStatus
+    error: Optional[str] = None
+    profile: Optional[dict] = None
@@ -1,13 +1,15 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, ConfigDict, Field, HttpUrl
 
-from src.utils.enums import SimulationInputAlgorithm
+from src.configs.env import Config
+from src.utils.enums import SimulationInputAlgorithm, SimulationResultFormat
 
 
 class SimulationInput(BaseModel):
     algorithm: SimulationInputAlgorithm
     url_or_json: HttpUrl | dict
+    seed: int = Config.SIMULATION_SEED
 
 
 class MigrationData(BaseModel):
@@ -22,6 +24,8 @@ class MigrationData(BaseModel):
 
 
 class ServiceState(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
     Object: str
     Time_Step: int = Field(alias="Time Step")
     Instance_ID: int = Field(alias="Instance ID")
@@ -30,9 +34,26 @@ class ServiceState(BaseModel):
     Being_Provisioned: bool = Field(alias="Being Provisioned")
     Last_Migration: Optional[MigrationData] = Field(alias="Last Migration")
 
-    class Config:
-        allow_population_by_field_name = True
-
 
 class SimulationServiceOutput(BaseModel):
     Service: List[ServiceState]
+
+
+class SimulationServiceColumnarOutput(BaseModel):
+    rows: int
+    Service: Dict[str, list]
+    """One list of values per `ServiceState` field, keyed by its alias."""
+
+
+class SimulationResultQuery(BaseModel):
+    """
+    How to shape and filter the service states returned for a simulation.
+    """
+
+    format: SimulationResultFormat = SimulationResultFormat.ROWS
+    step_from: Optional[int] = None
+    step_to: Optional[int] = None
+    step_stride: int = Field(default=1, ge=1)
+    """Keep only every `step_stride`-th step, counting from `step_from`."""
+    service_id: Optional[List[int]] = None
+    """Keep only the services with these instance IDs."""
@@ -0,0 +1,146 @@
+import asyncio
+from itertools import product
+from typing import AsyncIterator
+
+from fastapi import HTTPException
+from loguru import logger
+
+from src.configs.env import Config
+from src.esp_algorithms import algorithm_options
+from src.exceptions.http_exceptions import BatchTooLargeException
+from src.schemas.batch_schema import (
+    SimulationBatchInput,
+    SimulationBatchRun,
+    SimulationRunSummary,
+)
+from src.services.simulation_service import PreparedScenario, SimulationService
+from src.utils.enums import SimulationInputAlgorithm
+
+
+class BatchService:
+    """
+    Runs every algorithm × seed combination of a parameter sweep over one scenario.
+
+    The scenario is hashed and pickled once for the whole batch, and runs are
+    spread over the worker pool, where each worker initializes the scenario once
+    and restores it from a snapshot afterwards. Runs are not archived in the
+    logger service, which would receive the same scenario once per run.
+    """
+
+    @staticmethod
+    async def run(
+        batch_input: SimulationBatchInput, input_file: dict
+    ) -> list[SimulationBatchRun]:
+        """
+        Run the whole batch and return its runs in sweep order.
+        """
+        runs = BatchService.runs(batch_input)
+        logger.info(f"Running a batch of {len(runs)} simulations")
+        prepared_scenario = await SimulationService.prepare_scenario(
+            input_file, encode=True
+        )
+        return await asyncio.gather(
+            *(
+                BatchService._run_one(
+                    algorithm, seed_value, prepared_scenario, batch_input
+                )
+                for algorithm, seed_value in runs
+            )
+        )
+
+    @staticmethod
+    async def stream(
+        batch_input: SimulationBatchInput, input_file: dict
+    ) -> AsyncIterator[SimulationBatchRun]:
+        """
+        Run the whole batch and yield each run as soon as it finishes. Closing the
+        iterator cancels the runs that haven't started yet.
+        """
+        runs = BatchService.runs(batch_input)
+        logger.info(f"Running a batch of {len(runs)} simulations")
+        prepared_scenario = await SimulationService.prepare_scenario(
+            input_file, encode=True
+        )
+        tasks = [
+            asyncio.create_task(
+                BatchService._run_one(
+                    algorithm, seed_value, prepared_scenario, batch_input
+                )
+            )
+            for algorithm, seed_value in runs
+        ]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def summarize(results: list[dict] | None) -> SimulationRunSummary:
+        """
+        Compact description of a run's service metrics.
+        """
+        services_per_step: dict[int, int] = {}
+        placed_per_step: dict[int, int] = {}
+        for row in results or []:
+            step = row["Time Step"]
+            services_per_step[step] = services_per_step.get(step, 0) + 1
+            placed_per_step[step] = placed_per_step.get(step, 0) + (
+                row["Server"] is not None
+            )
+
+        last_step = max(services_per_step, default=0)
+        return SimulationRunSummary(
+            steps=last_step,
+            services=services_per_step.get(last_step, 0),
+            placed_services=placed_per_step.get(last_step, 0),
+            all_placed_at_step=next(
+                (
+                    step
+                    for step in sorted(services_per_step)
+                    if placed_per_step[step] == services_per_step[step]
+                ),
+                None,
+            ),
+        )
+
+    @staticmethod
+    def runs(
+        batch_input: SimulationBatchInput,
+    ) -> list[tuple[SimulationInputAlgorithm, int]]:
+        """
+        The batch's (algorithm, seed) combinations, or raise if there are too many.
+        """
+        runs = list(product(batch_input.algorithms, batch_input.seeds))
+        if len(runs) > Config.SIMULATION_BATCH_MAX_RUNS:
+            raise BatchTooLargeException(len(runs), Config.SIMULATION_BATCH_MAX_RUNS)
+        return runs
+
+    @staticmethod
+    async def _run_one(
+        algorithm: SimulationInputAlgorithm,
+        seed_value: int,
+        prepared_scenario: PreparedScenario,
+        batch_input: SimulationBatchInput,
+    ) -> SimulationBatchRun:
+        try:
+            results = await SimulationService.run(
+                algorithm=algorithm_options[algorithm],
+                input_file=prepared_scenario.input_file,
+                metrics_from="Service",
+                seed_value=seed_value,
+                prepared_scenario=prepared_scenario,
+                archive=False,
+            )
+        except HTTPException as error:
+            return SimulationBatchRun(
+                algorithm=algorithm, seed=seed_value, error=error.detail
+            )
+
+        return SimulationBatchRun(
+            algorithm=algorithm,
+            seed=seed_value,
+            summary=BatchService.summarize(results),
+            Service=results if batch_input.include_results else None,
+        )
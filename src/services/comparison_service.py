@@ -0,0 +1,98 @@
+import asyncio
+
+from fastapi import HTTPException
+from loguru import logger
+
+from src.esp_algorithms import algorithm_options
+from src.schemas.batch_schema import SimulationRunSummary
+from src.schemas.comparison_schema import (
+    SimulationComparisonInput,
+    SimulationComparisonRun,
+    SimulationSummaryDelta,
+)
+from src.services.batch_service import BatchService
+from src.services.simulation_service import PreparedScenario, SimulationService
+from src.utils.enums import SimulationInputAlgorithm
+
+
+class ComparisonService:
+    """
+    Runs several algorithms side by side on the same scenario.
+
+    The scenario is initialized once and every algorithm starts from a copy of
+    that state, all of them running concurrently in the worker pool. Like batch
+    runs, they are not archived in the logger service.
+    """
+
+    @staticmethod
+    async def compare(
+        comparison_input: SimulationComparisonInput, input_file: dict
+    ) -> list[SimulationComparisonRun]:
+        """
+        Run every algorithm and return their runs, with summary deltas relative to
+        the first algorithm.
+        """
+        logger.info(
+            f"Comparing {', '.join(comparison_input.algorithms)} "
+            f"with seed {comparison_input.seed}"
+        )
+        prepared_scenario = await SimulationService.prepare_scenario(
+            input_file, encode=True
+        )
+        await SimulationService.snapshot_scenario(
+            prepared_scenario, comparison_input.seed
+        )
+        runs = await asyncio.gather(
+            *(
+                ComparisonService._run_one(
+                    algorithm, prepared_scenario, comparison_input
+                )
+                for algorithm in comparison_input.algorithms
+            )
+        )
+
+        baseline = runs[0].summary
+        for run in runs:
+            run.delta = ComparisonService._delta(run.summary, baseline)
+        return runs
+
+    @staticmethod
+    def _delta(
+        summary: SimulationRunSummary | None, baseline: SimulationRunSummary | None
+    ) -> SimulationSummaryDelta | None:
+        if summary is None or baseline is None:
+            return None
+        all_placed_at_step = None
+        if None not in (summary.all_placed_at_step, baseline.all_placed_at_step):
+            all_placed_at_step = (
+                summary.all_placed_at_step - baseline.all_placed_at_step
+            )
+        return SimulationSummaryDelta(
+            steps=summary.steps - baseline.steps,
+            placed_services=summary.placed_services - baseline.placed_services,
+            all_placed_at_step=all_placed_at_step,
+        )
+
+    @staticmethod
+    async def _run_one(
+        algorithm: SimulationInputAlgorithm,
+        prepared_scenario: PreparedScenario,
+        comparison_input: SimulationComparisonInput,
+    ) -> SimulationComparisonRun:
+        try:
+            results = await SimulationService.run(
+                algorithm=algorithm_options[algorithm],
+                input_file=prepared_scenario.input_file,
+                metrics_from="Service",
+                seed_value=comparison_input.seed,
+                prepared_scenario=prepared_scenario,
+                archive=False,
+            )
+        except HTTPException as error:
+            return SimulationComparisonRun(algorithm=algorithm, error=error.detail)
+
+        return SimulationComparisonRun(
+            algorithm=algorithm,
+            summary=BatchService.summarize(results),
+            Service=results if comparison_input.include_results else None,
+        )
@@ -0,0 +1,201 @@
+import asyncio
+import json
+from pathlib import Path
+from uuid import UUID, uuid4
+
+from fastapi import HTTPException
+from loguru import logger
+from pydantic_core import to_json
+
+from src.configs.env import Config
+from src.esp_algorithms import algorithm_options
+from src.exceptions.http_exceptions import (
+    AlgorithmException,
+    JobFailedException,
+    JobNotFinishedException,
+    JobNotFoundException,
+)
+from src.schemas.job_schema import SimulationJob
+from src.services.simulation_service import SimulationService
+from src.utils.enums import (
+    SimulationInputAlgorithm,
+    SimulationJobStatus,
+    SimulationResultOptions,
+)
+from src.utils.profiler import PROFILER, PhaseTimer
+
+
+class JobService:
+    """
+    Registry of simulation jobs shared by every API worker process.
+
+    A job runs in the process that accepted it, which keeps its record, and its
+    result once it finishes, in `SIMULATION_JOBS_DIR`, so that any process can
+    serve it. Records of jobs in flight are `<id>.json`; once a job is done, its
+    record moves to `<id>.done.json` next to its `<id>.result.json`. Done jobs are
+    kept within `SIMULATION_JOBS_MAX_BYTES`, the oldest being removed first.
+    """
+
+    _tasks: dict[UUID, asyncio.Task] = {}
+    """Jobs running in this process."""
+
+    @classmethod
+    async def submit(
+        cls,
+        algorithm: SimulationInputAlgorithm,
+        input_file: dict,
+        metrics_from: SimulationResultOptions = "Service",
+        seed_value: int = Config.SIMULATION_SEED,
+        profile: bool = False,
+        cprofile: bool = False,
+    ) -> SimulationJob:
+        """
+        Schedule a simulation and return immediately with its job record. A
+        profiled job keeps its profile in its record once it is done.
+        """
+        job = SimulationJob(
+            id=uuid4(), algorithm=algorithm, status=SimulationJobStatus.PENDING
+        )
+        await asyncio.to_thread(cls._write_record, job)
+        timer = PhaseTimer(cprofile=cprofile) if profile or cprofile else None
+        task = asyncio.create_task(
+            cls._run(job, input_file, metrics_from, seed_value, timer)
+        )
+        cls._tasks[job.id] = task
+        task.add_done_callback(lambda _: cls._tasks.pop(job.id, None))
+        logger.info(f"Simulation job {job.id} submitted")
+        return job
+
+    @classmethod
+    async def get(cls, job_id: UUID) -> SimulationJob:
+        record = await asyncio.to_thread(cls._read_record, job_id)
+        if record is None:
+            raise JobNotFoundException(job_id)
+        return SimulationJob.model_validate_json(record)
+
+    @classmethod
+    async def result(cls, job_id: UUID) -> list | None:
+        """
+        Get the result of a finished job, or raise if it has not finished yet.
+        """
+        job = await cls.get(job_id)
+        if job.status == SimulationJobStatus.FAILED:
+            raise JobFailedException(job_id, job.error)
+        if job.status != SimulationJobStatus.FINISHED:
+            raise JobNotFinishedException(job_id, job.status)
+        try:
+            encoded = await asyncio.to_thread(cls._result_path(job_id).read_bytes)
+        except FileNotFoundError:
+            # Removed to make room for newer jobs since its record was read.
+            raise JobNotFoundException(job_id)
+        return await asyncio.to_thread(json.loads, encoded)
+
+    @staticmethod
+    def clear() -> None:
+        """
+        Remove the records of jobs left in flight by a previous run of the API.
+        """
+        for path in Path(Config.SIMULATION_JOBS_DIR).glob("*.json"):
+            if not path.name.endswith((".done.json", ".result.json")):
+                path.unlink(missing_ok=True)
+
+    @classmethod
+    async def _run(
+        cls,
+        job: SimulationJob,
+        input_file: dict,
+        metrics_from: SimulationResultOptions,
+        seed_value: int,
+        timer: PhaseTimer | None,
+    ) -> None:
+        # Jobs run in their own task, so this only applies to this job.
+        PROFILER.set(timer)
+        job.status = SimulationJobStatus.RUNNING
+        await asyncio.to_thread(cls._write_record, job)
+        result = None
+        try:
+            result = await SimulationService.run(
+                algorithm=algorithm_options[job.algorithm],
+                input_file=input_file,
+                metrics_from=metrics_from,
+                seed_value=seed_value,
+            )
+            job.status = SimulationJobStatus.FINISHED
+        except HTTPException as error:
+            job.status = SimulationJobStatus.FAILED
+            job.error = error.detail
+        except Exception:
+            logger.exception(f"Simulation job {job.id} failed")
+            job.status = SimulationJobStatus.FAILED
+            job.error = AlgorithmException(job.algorithm).detail
+        if timer is not None:
+            job.profile = timer.as_dict()
+
+        try:
+            await asyncio.to_thread(cls._write_done, job, result)
+            await asyncio.to_thread(cls._evict_done_jobs)
+        except OSError as error:
+            logger.error(f"Error saving simulation job {job.id}: {error}")
+
+    @staticmethod
+    def _record_path(job_id: UUID, done: bool = False) -> Path:
+        suffix = ".done.json" if done else ".json"
+        return Path(Config.SIMULATION_JOBS_DIR) / f"{job_id}{suffix}"
+
+    @staticmethod
+    def _result_path(job_id: UUID | str) -> Path:
+        return Path(Config.SIMULATION_JOBS_DIR) / f"{job_id}.result.json"
+
+    @staticmethod
+    def _write(path: Path, encoded: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = path.with_name(f"{path.name}.tmp")
+        temporary_path.write_bytes(encoded)
+        temporary_path.replace(path)
+
+    @classmethod
+    def _write_record(cls, job: SimulationJob) -> None:
+        cls._write(cls._record_path(job.id), job.model_dump_json().encode())
+
+    @classmethod
+    def _write_done(cls, job: SimulationJob, result: list | None) -> None:
+        if job.status == SimulationJobStatus.FINISHED:
+            cls._write(cls._result_path(job.id), to_json(result))
+        cls._write(cls._record_path(job.id, done=True), job.model_dump_json().encode())
+        cls._record_path(job.id).unlink(missing_ok=True)
+
+    @classmethod
+    def _read_record(cls, job_id: UUID) -> bytes | None:
+        # A job's done record is written before its in-flight record is removed,
+        # so one of them is always there.
+        for path in (cls._record_path(job_id), cls._record_path(job_id, done=True)):
+            try:
+                return path.read_bytes()
+            except FileNotFoundError:
+                continue
+        return None
+
+    @classmethod
+    def _evict_done_jobs(cls) -> None:
+        done_jobs = []
+        size_in_bytes = 0
+        for record_path in Path(Config.SIMULATION_JOBS_DIR).glob("*.done.json"):
+            job_id = record_path.name.removesuffix(".done.json")
+            result_path = cls._result_path(job_id)
+            try:
+                record_stat = record_path.stat()
+                job_size = record_stat.st_size
+                if result_path.exists():
+                    job_size += result_path.stat().st_size
+            except FileNotFoundError:
+                continue
+            done_jobs.append((record_stat.st_mtime, job_size, record_path, result_path))
+            size_in_bytes += job_size
+
+        done_jobs.sort(key=lambda job: job[0])
+        for _, job_size, record_path, result_path in done_jobs:
+            if size_in_bytes <= Config.SIMULATION_JOBS_MAX_BYTES:
+                break
+            result_path.unlink(missing_ok=True)
+            record_path.unlink(missing_ok=True)
+            size_in_bytes -= job_size
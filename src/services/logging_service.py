@@ -1,7 +1,10 @@
-from uuid import UUID
+import asyncio
+import os
+import time
+from pathlib import Path
+from uuid import UUID, uuid4
 
 import httpx
-from fastapi_cache.decorator import cache
 from loguru import logger
 
 from src.configs.env import Config
@@ -10,36 +13,123 @@ from src.utils.json_processor import replace_inf_values
 
 
 class LoggingService:
-    @staticmethod
-    @cache(expire=60 * 5)
-    async def get_log(hash: str) -> dict:
+    """
+    Talks to the logger service.
+
+    Logs are shipped in the background: `archive_log` only enqueues them, and a
+    shipper task uploads them in batches through a shared keep-alive client,
+    retrying with exponential backoff. Logs that don't fit in the queue, or that
+    can't be delivered, are spooled to disk and retried later.
+    """
+
+    _client: httpx.AsyncClient | None = None
+    _queue: asyncio.Queue[bytes | Path] | None = None
+    _shipper: asyncio.Task | None = None
+    _background_tasks: set[asyncio.Task] = set()
+
+    _shipped_total = 0
+    _failed_attempts_total = 0
+    _spooled_total = 0
+    _dropped_total = 0
+    _last_ship_latency_ms = 0.0
+    _total_ship_latency_ms = 0.0
+
+    @classmethod
+    def start(cls) -> None:
         """
-        Get the log from the logger service.
+        Start the background shipper. Calling it again is a no-op.
         """
-        logger.info(f"Fetching log with hash: {hash}")
-        async with httpx.AsyncClient(timeout=11) as client:
-            response = await client.get(
-                f"{Config.LOGGER_API_URL}/log/{hash}/metrics",
-                headers={"API-KEY": Config.LOGGER_API_KEY},
-            )
-            if not response.status_code == 200:
-                logger.error(f"Error fetching log: {response.text}")
-                response.raise_for_status()
-            return response.json()
+        if cls._shipper is not None and not cls._shipper.done():
+            return
+        Path(Config.LOG_SPOOL_DIR).mkdir(parents=True, exist_ok=True)
+        if cls._queue is None:
+            # A shipper that died leaves its queue behind, logs included.
+            cls._queue = asyncio.Queue(maxsize=Config.LOG_SHIPPING_QUEUE_SIZE)
+        cls._shipper = asyncio.create_task(cls._ship_forever())
+
+    @classmethod
+    async def stop(cls) -> None:
+        """
+        Stop the shipper, spool whatever is still queued and close the client.
+        """
+        if cls._shipper is not None:
+            cls._shipper.cancel()
+            await asyncio.gather(cls._shipper, return_exceptions=True)
+            cls._shipper = None
+        await asyncio.gather(*cls._background_tasks, return_exceptions=True)
+
+        while cls._queue is not None and not cls._queue.empty():
+            item = cls._queue.get_nowait()
+            if isinstance(item, bytes):
+                cls._spool(item)
+            else:
+                cls._release(item)
+        cls._queue = None
+
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
 
     @staticmethod
-    def save_log(
+    def release_claimed_spool() -> None:
+        """
+        Put back the spooled logs claimed by a previous run of the API, which it
+        didn't get to ship.
+        """
+        for claimed_path in Path(Config.LOG_SPOOL_DIR).glob("*.json.*"):
+            try:
+                LoggingService._release(claimed_path)
+            except OSError as error:
+                logger.error(f"Error releasing spooled log {claimed_path}: {error}")
+
+    @classmethod
+    def archive_log(
+        cls,
         request_uuid: str | UUID,
         input_file: dict,
         agent_metrics: dict,
         algorithm_name: str,
     ):
         """
-        Save the log to the logger service.
+        Queue the log for shipping to the logger service. Never blocks.
+        """
+        cls.start()
+        task = asyncio.create_task(
+            cls._enqueue(request_uuid, input_file, agent_metrics, algorithm_name)
+        )
+        cls._background_tasks.add(task)
+        task.add_done_callback(cls._background_tasks.discard)
+
+    @classmethod
+    def metrics(cls) -> dict:
+        """
+        Counters and gauges describing the state of log shipping.
         """
+        return {
+            "queue_depth": cls._queue.qsize() if cls._queue is not None else 0,
+            "spooled_files": len(list(Path(Config.LOG_SPOOL_DIR).glob("*.json"))),
+            "shipped_total": cls._shipped_total,
+            "failed_attempts_total": cls._failed_attempts_total,
+            "spooled_total": cls._spooled_total,
+            "dropped_total": cls._dropped_total,
+            "last_ship_latency_ms": cls._last_ship_latency_ms,
+            "total_ship_latency_ms": cls._total_ship_latency_ms,
+            "average_ship_latency_ms": (
+                cls._total_ship_latency_ms / cls._shipped_total
+                if cls._shipped_total
+                else 0.0
+            ),
+        }
+
+    @staticmethod
+    def _encode_log(
+        request_uuid: str | UUID,
+        input_file: dict,
+        agent_metrics: dict,
+        algorithm_name: str,
+    ) -> bytes:
         if isinstance(request_uuid, UUID):
             request_uuid = str(request_uuid)
-        logger.warning(f"Saving log with hash: {request_uuid}")
 
         input_file: dict = replace_inf_values(input_file)
         agent_metrics: dict = replace_inf_values(agent_metrics)
@@ -50,14 +140,144 @@ class LoggingService:
             agent_metrics=agent_metrics,
             algorithm=algorithm_name,
         )
-        with httpx.Client(timeout=11) as client:
-            response = client.post(
-                f"{Config.LOGGER_API_URL}/log/",
-                json=log.model_dump(),
-                headers={"API-KEY": Config.LOGGER_API_KEY},
+        return log.model_dump_json().encode()
+
+    @classmethod
+    async def _enqueue(
+        cls,
+        request_uuid: str | UUID,
+        input_file: dict,
+        agent_metrics: dict,
+        algorithm_name: str,
+    ) -> None:
+        logger.warning(f"Queueing log with hash: {request_uuid}")
+        body = await asyncio.to_thread(
+            cls._encode_log, request_uuid, input_file, agent_metrics, algorithm_name
+        )
+        try:
+            cls._queue.put_nowait(body)
+        except asyncio.QueueFull:
+            logger.warning("Log shipping queue is full; spooling log to disk")
+            await asyncio.to_thread(cls._spool, body)
+
+    @classmethod
+    async def _ship_forever(cls) -> None:
+        await cls._recover_spool()
+        while True:
+            try:
+                item = await asyncio.wait_for(
+                    cls._queue.get(), timeout=Config.LOG_SPOOL_RETRY_SECONDS
+                )
+            except TimeoutError:
+                await cls._recover_spool()
+                continue
+
+            batch = [item]
+            while (
+                len(batch) < Config.LOG_SHIPPING_BATCH_SIZE and not cls._queue.empty()
+            ):
+                batch.append(cls._queue.get_nowait())
+            await asyncio.gather(*(cls._ship(item) for item in batch))
+
+    @classmethod
+    async def _ship(cls, item: bytes | Path) -> None:
+        try:
+            body = (
+                item
+                if isinstance(item, bytes)
+                else await asyncio.to_thread(item.read_bytes)
             )
-            if not response.status_code == 201:
+        except OSError as error:
+            logger.error(f"Error reading spooled log {item}: {error}")
+            return
+        started_at = time.perf_counter()
+        for attempt in range(Config.LOG_SHIPPING_MAX_RETRIES):
+            try:
+                response = await cls._get_client().post(
+                    "/log/",
+                    content=body,
+                    headers={"Content-Type": "application/json"},
+                )
+                if response.status_code == 201:
+                    cls._record_shipped(started_at)
+                    if isinstance(item, Path):
+                        item.unlink(missing_ok=True)
+                    return
                 logger.error(f"Error saving log: {response.text}")
-                response.raise_for_status()
+                if response.status_code < 500:
+                    cls._dropped_total += 1
+                    if isinstance(item, Path):
+                        item.unlink(missing_ok=True)
+                    return
+            except httpx.HTTPError as error:
+                logger.error(f"Error saving log: {error!r}")
+            cls._failed_attempts_total += 1
+            await asyncio.sleep(Config.LOG_SHIPPING_BACKOFF_SECONDS * 2**attempt)
+
+        logger.error("Logger service unavailable; keeping log in the disk spool")
+        try:
+            if isinstance(item, bytes):
+                await asyncio.to_thread(cls._spool, body)
+            else:
+                cls._release(item)
+        except OSError as error:
+            logger.error(f"Error spooling log: {error}")
+
+    @classmethod
+    def _record_shipped(cls, started_at: float) -> None:
+        latency_ms = (time.perf_counter() - started_at) * 1000
+        cls._shipped_total += 1
+        cls._last_ship_latency_ms = latency_ms
+        cls._total_ship_latency_ms += latency_ms
+        logger.info(f"Log saved successfully in {latency_ms:.2f}ms")
+
+    @classmethod
+    def _spool(cls, body: bytes) -> None:
+        spool_dir = Path(Config.LOG_SPOOL_DIR)
+        temporary_path = spool_dir / f"{uuid4()}.tmp"
+        temporary_path.write_bytes(body)
+        temporary_path.rename(temporary_path.with_suffix(".json"))
+        cls._spooled_total += 1
+
+    @classmethod
+    async def _recover_spool(cls) -> None:
+        """
+        Move spooled logs back into the queue while there is room. Files are
+        claimed by renaming them, so API workers sharing the spool don't ship the
+        same log twice.
+        """
+        spooled = []
+        for path in Path(Config.LOG_SPOOL_DIR).glob("*.json"):
+            try:
+                spooled.append((path.stat().st_mtime, path))
+            except OSError:
+                # Claimed by another API worker in the meantime.
+                continue
+        for _, path in sorted(spooled):
+            if cls._queue.full():
+                return
+            claimed_path = path.with_name(f"{path.name}.{os.getpid()}")
+            try:
+                path.rename(claimed_path)
+            except OSError:
+                continue
+            cls._queue.put_nowait(claimed_path)
 
-        logger.info(f"Log saved successfully: {response.json()}")
+    @staticmethod
+    def _release(claimed_path: Path) -> None:
+        claimed_path.rename(claimed_path.with_suffix(""))
+
+    @classmethod
+    def _get_client(cls) -> httpx.AsyncClient:
+        if cls._client is None:
+            cls._client = httpx.AsyncClient(
+                base_url=Config.LOGGER_API_URL or "",
+                headers={"API-KEY": Config.LOGGER_API_KEY or ""},
+                timeout=Config.LOGGER_API_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=Config.LOG_SHIPPING_BATCH_SIZE * 2,
+                    max_keepalive_connections=Config.LOG_SHIPPING_BATCH_SIZE,
+                    keepalive_expiry=60,
+                ),
+            )
+        return cls._client
@@ -0,0 +1,322 @@
+import asyncio
+import json
+import os
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from loguru import logger
+
+from src.configs.env import Config
+from src.services.logging_service import LoggingService
+from src.services.result_cache_service import ResultCacheService
+from src.services.scenario_service import ScenarioService
+from src.services.worker_pool_service import WorkerPoolService
+
+_DURATION_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+_STEP_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+_METRICS: dict[str, tuple[str, str]] = {
+    "simulation_jobs_in_flight": (
+        "gauge",
+        "Simulation jobs submitted to the worker pool and not finished yet.",
+    ),
+    "simulation_jobs_queued": (
+        "gauge",
+        "Simulation jobs waiting for a free worker.",
+    ),
+    "simulation_workers": ("gauge", "Simulation worker processes."),
+    "simulation_workers_busy": ("gauge", "Simulation workers running a job."),
+    "simulation_worker_utilization": (
+        "gauge",
+        "Share of the simulation workers running a job.",
+    ),
+    "simulation_worker_busy_seconds_total": (
+        "counter",
+        "Time simulation workers spent running jobs.",
+    ),
+    "simulation_jobs_total": ("counter", "Simulation jobs finished, by status."),
+    "simulation_worker_peak_rss_bytes": (
+        "gauge",
+        "Peak resident memory of each simulation worker, as of its last job.",
+    ),
+    "simulation_duration_seconds": (
+        "histogram",
+        "Time to run a simulation in the worker pool, by algorithm.",
+    ),
+    "simulation_steps": ("histogram", "Steps run by a simulation, by algorithm."),
+    "result_cache_hits_total": ("counter", "Simulation results served from cache."),
+    "result_cache_misses_total": ("counter", "Simulation results not in cache."),
+    "scenario_cache_hits_total": (
+        "counter",
+        "Scenarios referenced by URL served from cache.",
+    ),
+    "scenario_cache_misses_total": (
+        "counter",
+        "Scenarios referenced by URL downloaded.",
+    ),
+    "logger_api_shipped_total": ("counter", "Logs saved in the logger service."),
+    "logger_api_failed_attempts_total": (
+        "counter",
+        "Failed attempts to save a log in the logger service.",
+    ),
+    "logger_api_dropped_total": (
+        "counter",
+        "Logs rejected by the logger service.",
+    ),
+    "logger_api_spooled_total": ("counter", "Logs spooled to disk."),
+    "logger_api_queue_depth": ("gauge", "Logs waiting to be shipped."),
+    "logger_api_ship_latency_seconds": (
+        "summary",
+        "Time to save a log in the logger service, retries included.",
+    ),
+}
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def as_dict(self) -> dict:
+        return {"counts": self.counts, "sum": self.sum}
+
+
+class MetricsService:
+    """
+    Prometheus metrics of the API, aggregated across its uvicorn workers.
+
+    Each worker process periodically writes a snapshot of its metrics to
+    `METRICS_DIR`. A scrape, whichever worker serves it, adds up the snapshots of
+    every process: counters and histograms of processes that exited are kept,
+    gauges only come from processes that are still running.
+    """
+
+    _durations: dict[str, _Histogram] = {}
+    _steps: dict[str, _Histogram] = {}
+    _writer: asyncio.Task | None = None
+
+    @classmethod
+    def observe_simulation(
+        cls, algorithm_name: str, duration_seconds: float, steps: int
+    ) -> None:
+        if algorithm_name not in cls._durations:
+            cls._durations[algorithm_name] = _Histogram(_DURATION_BUCKETS)
+            cls._steps[algorithm_name] = _Histogram(_STEP_BUCKETS)
+        cls._durations[algorithm_name].observe(duration_seconds)
+        cls._steps[algorithm_name].observe(steps)
+
+    @classmethod
+    def start(cls) -> None:
+        """
+        Start writing this process' snapshots. Calling it again is a no-op.
+        """
+        if cls._writer is not None and not cls._writer.done():
+            return
+        cls._writer = asyncio.create_task(cls._write_forever())
+
+    @classmethod
+    async def stop(cls) -> None:
+        """
+        Stop writing snapshots and leave a last one without this process' gauges.
+        """
+        if cls._writer is not None:
+            cls._writer.cancel()
+            await asyncio.gather(cls._writer, return_exceptions=True)
+            cls._writer = None
+        await asyncio.to_thread(cls._write, cls.snapshot(alive=False))
+
+    @staticmethod
+    def clear() -> None:
+        """
+        Remove the snapshots of a previous run of the API.
+        """
+        for path in Path(Config.METRICS_DIR).glob("*.json"):
+            path.unlink(missing_ok=True)
+
+    @classmethod
+    def snapshot(cls, alive: bool = True) -> dict:
+        """
+        This process' metrics, as written to `METRICS_DIR`.
+        """
+        pool = WorkerPoolService.metrics()
+        logs = LoggingService.metrics()
+        pid = os.getpid()
+
+        counters = {
+            "simulation_worker_busy_seconds_total": {"": pool["busy_seconds_total"]},
+            "simulation_jobs_total": {
+                _labels(status=status): count
+                for status, count in pool["jobs_total"].items()
+            },
+            "result_cache_hits_total": {"": ResultCacheService.hits},
+            "result_cache_misses_total": {"": ResultCacheService.misses},
+            "scenario_cache_hits_total": {"": ScenarioService.hits},
+            "scenario_cache_misses_total": {"": ScenarioService.misses},
+            "logger_api_shipped_total": {"": logs["shipped_total"]},
+            "logger_api_failed_attempts_total": {"": logs["failed_attempts_total"]},
+            "logger_api_dropped_total": {"": logs["dropped_total"]},
+            "logger_api_spooled_total": {"": logs["spooled_total"]},
+            "logger_api_ship_latency_seconds": {
+                "_sum": logs["total_ship_latency_ms"] / 1000,
+                "_count": logs["shipped_total"],
+            },
+        }
+        gauges = {}
+        if alive:
+            gauges = {
+                "simulation_jobs_in_flight": {"": pool["jobs_in_flight"]},
+                "simulation_jobs_queued": {"": pool["jobs_queued"]},
+                "simulation_workers": {"": pool["workers"]},
+                "simulation_workers_busy": {"": pool["busy_workers"]},
+                "simulation_worker_peak_rss_bytes": {
+                    _labels(process=pid, worker=worker): memory_mb * 2**20
+                    for worker, memory_mb in pool["worker_peak_memory_mb"].items()
+                },
+                "logger_api_queue_depth": {"": logs["queue_depth"]},
+            }
+        histograms = {
+            "simulation_duration_seconds": {
+                _labels(algorithm=algorithm): histogram.as_dict()
+                for algorithm, histogram in cls._durations.items()
+            },
+            "simulation_steps": {
+                _labels(algorithm=algorithm): histogram.as_dict()
+                for algorithm, histogram in cls._steps.items()
+            },
+        }
+        return {
+            "pid": pid,
+            "written_at": time.time(),
+            "alive": alive,
+            "counters": counters,
+            "gauges": gauges,
+            "histograms": histograms,
+        }
+
+    @classmethod
+    async def render(cls) -> str:
+        """
+        The metrics of every API worker in the Prometheus text format.
+        """
+        snapshot = cls.snapshot()
+        await asyncio.to_thread(cls._write, snapshot)
+        snapshots = await asyncio.to_thread(cls._read_all)
+        return _render(_merge(snapshots))
+
+    @classmethod
+    async def _write_forever(cls) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(cls._write, cls.snapshot())
+            except OSError as error:
+                logger.error(f"Error writing metrics snapshot: {error}")
+            await asyncio.sleep(Config.METRICS_WRITE_INTERVAL_SECONDS)
+
+    @staticmethod
+    def _write(snapshot: dict) -> None:
+        metrics_dir = Path(Config.METRICS_DIR)
+        metrics_dir.mkdir(parents=True, exist_ok=True)
+        temporary_path = metrics_dir / f"{snapshot['pid']}.tmp"
+        temporary_path.write_text(json.dumps(snapshot))
+        temporary_path.replace(metrics_dir / f"{snapshot['pid']}.json")
+
+    @staticmethod
+    def _read_all() -> list[dict]:
+        stale_before = time.time() - 3 * Config.METRICS_WRITE_INTERVAL_SECONDS
+        snapshots = []
+        for path in Path(Config.METRICS_DIR).glob("*.json"):
+            try:
+                snapshot = json.loads(path.read_bytes())
+            except (OSError, ValueError):
+                continue
+            if snapshot["written_at"] < stale_before:
+                # The process died without saying so; its gauges are meaningless.
+                snapshot["gauges"] = {}
+            snapshots.append(snapshot)
+        return snapshots
+
+
+def _labels(**labels: object) -> str:
+    pairs = ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in labels.items()
+    )
+    return f"{{{pairs}}}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _merge(snapshots: list[dict]) -> dict:
+    merged = {"counters": {}, "gauges": {}, "histograms": {}}
+    for snapshot in snapshots:
+        for kind in ("counters", "gauges"):
+            for name, samples in snapshot[kind].items():
+                totals = merged[kind].setdefault(name, {})
+                for labels, value in samples.items():
+                    totals[labels] = totals.get(labels, 0) + value
+        for name, series in snapshot["histograms"].items():
+            totals = merged["histograms"].setdefault(name, {})
+            for labels, histogram in series.items():
+                if labels not in totals:
+                    totals[labels] = {
+                        "counts": [0] * len(histogram["counts"]),
+                        "sum": 0.0,
+                    }
+                total = totals[labels]
+                total["counts"] = [
+                    count + added
+                    for count, added in zip(total["counts"], histogram["counts"])
+                ]
+                total["sum"] += histogram["sum"]
+
+    workers = merged["gauges"].get("simulation_workers", {}).get("", 0)
+    busy_workers = merged["gauges"].get("simulation_workers_busy", {}).get("", 0)
+    merged["gauges"]["simulation_worker_utilization"] = {
+        "": busy_workers / workers if workers else 0.0
+    }
+    return merged
+
+
+def _render(merged: dict) -> str:
+    buckets = {
+        "simulation_duration_seconds": _DURATION_BUCKETS,
+        "simulation_steps": _STEP_BUCKETS,
+    }
+    lines = []
+    for name, (kind, description) in _METRICS.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "histogram":
+            for labels, histogram in sorted(merged["histograms"].get(name, {}).items()):
+                lines.extend(_render_histogram(name, labels, buckets[name], histogram))
+            continue
+
+        samples = merged["counters" if kind in ("counter", "summary") else "gauges"]
+        # Samples are keyed by their labels, or by their suffix for summaries.
+        for key, value in sorted(samples.get(name, {}).items()):
+            lines.append(f"{name}{key} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def _render_histogram(
+    name: str, labels: str, buckets: tuple[float, ...], histogram: dict
+) -> list[str]:
+    inner_labels = labels[1:-1]
+    separator = "," if inner_labels else ""
+    lines = []
+    cumulative = 0
+    for bound, count in zip((*buckets, "+Inf"), histogram["counts"]):
+        cumulative += count
+        lines.append(
+            f'{name}_bucket{{{inner_labels}{separator}le="{bound}"}} {cumulative}'
+        )
+    lines.append(f"{name}_sum{labels} {histogram['sum']}")
+    lines.append(f"{name}_count{labels} {cumulative}")
+    return lines
@@ -0,0 +1,141 @@
+import asyncio
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+from src.configs.env import Config
+
+_KEY_VERSION = 1
+"""Bump whenever a change to the algorithms or the simulation changes results."""
+
+
+def _canonical_json(value: Any) -> bytes:
+    return json.dumps(
+        value, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode()
+
+
+class ResultCacheService:
+    """
+    Simulation result cache keyed on the content of the run, not on its arguments.
+
+    Results live in an in-memory LRU bounded by a byte budget and, when
+    `RESULT_CACHE_DIR` is set, in a disk tier that survives restarts. The disk tier
+    has the same budget, and reads refresh its files' modification time so the
+    least recently used ones are removed first.
+    """
+
+    _entries: OrderedDict[str, tuple[Any, int]] = OrderedDict()
+    _size_in_bytes = 0
+    hits = 0
+    misses = 0
+
+    @staticmethod
+    def scenario_hash(input_file: dict) -> str:
+        """
+        Hash of the normalized scenario, independent of its key order.
+        """
+        return hashlib.sha256(_canonical_json(input_file)).hexdigest()
+
+    @staticmethod
+    def key(
+        scenario_hash: str, algorithm_name: str, seed: int, parameters: dict
+    ) -> str:
+        return hashlib.sha256(
+            _canonical_json(
+                {
+                    "version": _KEY_VERSION,
+                    "scenario": scenario_hash,
+                    "algorithm": algorithm_name,
+                    "seed": seed,
+                    "parameters": parameters,
+                }
+            )
+        ).hexdigest()
+
+    @classmethod
+    async def get(cls, key: str) -> Any | None:
+        if key in cls._entries:
+            cls._entries.move_to_end(key)
+            cls.hits += 1
+            return cls._entries[key][0]
+
+        if Config.RESULT_CACHE_DIR:
+            encoded = await asyncio.to_thread(cls._read_from_disk, key)
+            if encoded is not None:
+                value = await asyncio.to_thread(json.loads, encoded)
+                cls._remember(key, value, len(encoded))
+                cls.hits += 1
+                return value
+
+        cls.misses += 1
+        return None
+
+    @classmethod
+    async def set(cls, key: str, value: Any) -> None:
+        encoded = await asyncio.to_thread(_canonical_json, value)
+        cls._remember(key, value, len(encoded))
+        if Config.RESULT_CACHE_DIR:
+            await asyncio.to_thread(cls._write_to_disk, key, encoded)
+
+    @classmethod
+    def _remember(cls, key: str, value: Any, size_in_bytes: int) -> None:
+        if size_in_bytes > Config.RESULT_CACHE_MAX_BYTES:
+            return
+        if key in cls._entries:
+            cls._size_in_bytes -= cls._entries.pop(key)[1]
+        cls._entries[key] = (value, size_in_bytes)
+        cls._size_in_bytes += size_in_bytes
+
+        while cls._size_in_bytes > Config.RESULT_CACHE_MAX_BYTES:
+            _, (_, evicted_size) = cls._entries.popitem(last=False)
+            cls._size_in_bytes -= evicted_size
+
+    @staticmethod
+    def _read_from_disk(key: str) -> bytes | None:
+        path = Path(Config.RESULT_CACHE_DIR) / f"{key}.json"
+        try:
+            encoded = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except OSError as error:
+            logger.error(f"Error reading result from the disk cache: {error}")
+            return None
+        return encoded
+
+    @staticmethod
+    def _write_to_disk(key: str, encoded: bytes) -> None:
+        cache_dir = Path(Config.RESULT_CACHE_DIR)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        temporary_path = cache_dir / f"{key}.tmp"
+        try:
+            temporary_path.write_bytes(encoded)
+            temporary_path.rename(cache_dir / f"{key}.json")
+            ResultCacheService._evict_from_disk(cache_dir)
+        except OSError as error:
+            logger.error(f"Error writing result to the disk cache: {error}")
+
+    @staticmethod
+    def _evict_from_disk(cache_dir: Path) -> None:
+        entries = []
+        size_in_bytes = 0
+        for path in cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            size_in_bytes += stat.st_size
+
+        entries.sort(key=lambda entry: entry[0])
+        for _, entry_size, path in entries:
+            if size_in_bytes <= Config.RESULT_CACHE_MAX_BYTES:
+                break
+            path.unlink(missing_ok=True)
+            size_in_bytes -= entry_size
@@ -0,0 +1,231 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from uuid import uuid4
+
+import httpx
+from loguru import logger
+
+from src.configs.env import Config
+from src.exceptions.http_exceptions import (
+    ScenarioDownloadException,
+    ScenarioTooLargeException,
+)
+
+
+class _CachedScenario:
+    def __init__(
+        self,
+        scenario: dict,
+        size_in_bytes: int,
+        etag: str | None,
+        last_modified: str | None,
+    ):
+        self.scenario = scenario
+        self.size_in_bytes = size_in_bytes
+        self.etag = etag
+        self.last_modified = last_modified
+        self.validated_at = time.monotonic()
+
+
+class ScenarioService:
+    """
+    Downloads scenarios referenced by URL.
+
+    Downloads go through a shared connection pool, are streamed with a size cap
+    and a timeout, and are cached. Cached scenarios are revalidated with
+    ETag/Last-Modified once they are older than `SCENARIO_CACHE_FRESH_SECONDS`.
+    """
+
+    _client: httpx.AsyncClient | None = None
+    _cache: OrderedDict[str, _CachedScenario] = OrderedDict()
+    _size_in_bytes = 0
+    _in_flight: dict[str, asyncio.Task] = {}
+    hits = 0
+    """Scenarios served from cache, revalidated ones included."""
+    misses = 0
+    """Scenarios downloaded."""
+
+    @classmethod
+    async def fetch(cls, url: str) -> dict:
+        """
+        Get the scenario at `url`. Concurrent requests for the same URL share a
+        single download.
+        """
+        if url not in cls._in_flight:
+            cls._in_flight[url] = asyncio.create_task(cls._fetch(url))
+            cls._in_flight[url].add_done_callback(
+                lambda _: cls._in_flight.pop(url, None)
+            )
+        return await asyncio.shield(cls._in_flight[url])
+
+    @classmethod
+    async def _fetch(cls, url: str) -> dict:
+        cached = cls._cache.get(url) or await asyncio.to_thread(
+            cls._read_from_disk, url
+        )
+        if cached is not None and cls._is_fresh(cached):
+            cls.hits += 1
+            cls._remember(url, cached)
+            return cached.scenario
+
+        headers = {}
+        if cached is not None and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached is not None and cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+
+        try:
+            async with cls._get_client().stream(
+                "GET", url, headers=headers
+            ) as response:
+                if response.status_code == 304 and cached is not None:
+                    logger.info(f"Scenario not modified: {url}")
+                    cached.validated_at = time.monotonic()
+                    cls.hits += 1
+                    cls._remember(url, cached)
+                    return cached.scenario
+                if response.status_code != 200:
+                    raise ScenarioDownloadException(
+                        url, f"status code {response.status_code}"
+                    )
+                body = await cls._read_body(url, response)
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+        except httpx.HTTPError as error:
+            raise ScenarioDownloadException(url, repr(error)) from error
+
+        try:
+            scenario = await asyncio.to_thread(json.loads, body)
+        except ValueError as error:
+            raise ScenarioDownloadException(url, "invalid JSON") from error
+
+        logger.info(f"Scenario downloaded: {url} ({len(body)} bytes)")
+        cls.misses += 1
+        cached = _CachedScenario(scenario, len(body), etag, last_modified)
+        cls._remember(url, cached)
+        if Config.SCENARIO_CACHE_DIR and (etag or last_modified):
+            await asyncio.to_thread(cls._write_to_disk, url, body, cached)
+        return scenario
+
+    @staticmethod
+    async def _read_body(url: str, response: httpx.Response) -> bytes:
+        content_length = response.headers.get("Content-Length")
+        if content_length and int(content_length) > Config.SCENARIO_MAX_BYTES:
+            raise ScenarioTooLargeException(url, Config.SCENARIO_MAX_BYTES)
+
+        body = bytearray()
+        async for chunk in response.aiter_bytes():
+            body.extend(chunk)
+            if len(body) > Config.SCENARIO_MAX_BYTES:
+                raise ScenarioTooLargeException(url, Config.SCENARIO_MAX_BYTES)
+        return bytes(body)
+
+    @staticmethod
+    def _is_fresh(cached: _CachedScenario) -> bool:
+        age = time.monotonic() - cached.validated_at
+        return age < Config.SCENARIO_CACHE_FRESH_SECONDS
+
+    @classmethod
+    def _remember(cls, url: str, cached: _CachedScenario) -> None:
+        if url in cls._cache:
+            cls._size_in_bytes -= cls._cache.pop(url).size_in_bytes
+        if cached.size_in_bytes > Config.SCENARIO_CACHE_MAX_BYTES:
+            return
+        cls._cache[url] = cached
+        cls._size_in_bytes += cached.size_in_bytes
+
+        while cls._size_in_bytes > Config.SCENARIO_CACHE_MAX_BYTES:
+            _, evicted = cls._cache.popitem(last=False)
+            cls._size_in_bytes -= evicted.size_in_bytes
+
+    @staticmethod
+    def _disk_paths(url: str) -> tuple[Path, Path]:
+        name = hashlib.sha256(url.encode()).hexdigest()
+        cache_dir = Path(Config.SCENARIO_CACHE_DIR)
+        return cache_dir / f"{name}.json", cache_dir / f"{name}.meta.json"
+
+    @staticmethod
+    def _read_from_disk(url: str) -> _CachedScenario | None:
+        if not Config.SCENARIO_CACHE_DIR:
+            return None
+        body_path, meta_path = ScenarioService._disk_paths(url)
+        try:
+            meta = json.loads(meta_path.read_bytes())
+            body = body_path.read_bytes()
+            scenario = json.loads(body)
+            os.utime(body_path)
+        except (OSError, ValueError):
+            return None
+
+        cached = _CachedScenario(
+            scenario, len(body), meta.get("etag"), meta.get("last_modified")
+        )
+        # Scenarios restored from disk are always revalidated before use.
+        cached.validated_at = float("-inf")
+        return cached
+
+    @staticmethod
+    def _write_to_disk(url: str, body: bytes, cached: _CachedScenario) -> None:
+        """
+        Keep the scenario on disk within `SCENARIO_CACHE_MAX_BYTES`. Reads refresh
+        a scenario's modification time, so the least recently used ones are
+        removed first.
+        """
+        body_path, meta_path = ScenarioService._disk_paths(url)
+        meta = json.dumps(
+            {"etag": cached.etag, "last_modified": cached.last_modified}
+        ).encode()
+        try:
+            body_path.parent.mkdir(parents=True, exist_ok=True)
+            for path, content in ((body_path, body), (meta_path, meta)):
+                temporary_path = path.with_name(f"{path.name}.{uuid4().hex}.tmp")
+                temporary_path.write_bytes(content)
+                temporary_path.rename(path)
+            ScenarioService._evict_from_disk(body_path.parent)
+        except OSError as error:
+            logger.error(f"Error writing scenario to the disk cache: {error}")
+
+    @staticmethod
+    def _evict_from_disk(cache_dir: Path) -> None:
+        scenarios = []
+        size_in_bytes = 0
+        for body_path in cache_dir.glob("*.json"):
+            if body_path.name.endswith(".meta.json"):
+                continue
+            meta_path = body_path.with_name(f"{body_path.stem}.meta.json")
+            try:
+                stat = body_path.stat()
+                scenario_size = stat.st_size + meta_path.stat().st_size
+            except FileNotFoundError:
+                continue
+            scenarios.append((stat.st_mtime, scenario_size, body_path, meta_path))
+            size_in_bytes += scenario_size
+
+        scenarios.sort(key=lambda scenario: scenario[0])
+        for _, scenario_size, body_path, meta_path in scenarios:
+            if size_in_bytes <= Config.SCENARIO_CACHE_MAX_BYTES:
+                break
+            meta_path.unlink(missing_ok=True)
+            body_path.unlink(missing_ok=True)
+            size_in_bytes -= scenario_size
+
+    @classmethod
+    def _get_client(cls) -> httpx.AsyncClient:
+        if cls._client is None:
+            cls._client = httpx.AsyncClient(
+                timeout=Config.SCENARIO_FETCH_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=60),
+            )
+        return cls._client
+
+    @classmethod
+    async def close(cls) -> None:
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
@@ -1,100 +1,518 @@
-import multiprocessing
+import asyncio
+import cProfile
+import functools
+import pickle
+import time
 import uuid
+from pathlib import Path
 from random import seed
-from typing import Callable, Optional
+from typing import AsyncIterator, Callable, Optional
 
 import edge_sim_py as esp
 import numpy as np
-from fastapi_cache.decorator import cache
 from loguru import logger
 
-from src.configs.loguru import logger_config
+from src.configs.env import Config
 from src.exceptions.http_exceptions import AlgorithmException
+from src.exceptions.worker_exceptions import SimulationWorkerError
 from src.middleware.logger_middleware import REQUEST_UUID
 from src.schemas.algorithm_parameters import AlgorithmInputParameters
 from src.schemas.simulation_schema import SimulationServiceOutput
 from src.services.logging_service import LoggingService
+from src.services.metrics_service import MetricsService
+from src.services.result_cache_service import ResultCacheService
+from src.services.snapshot_service import SnapshotService
+from src.services.worker_pool_service import WorkerPoolService, emit
+from src.utils.component_registry import component_classes
 from src.utils.enums import SimulationResultOptions
+from src.utils.json_processor import replace_inf_values
+from src.utils.profiler import PROFILER, PhaseTimer, profile_phase
+
+
+class PreparedScenario:
+    """
+    Scenario hashed, and pickled, once for all the runs that share it.
+    """
+
+    def __init__(self, input_file: dict, scenario_hash: str, encoded: bytes | None):
+        self.input_file = input_file
+        self.hash = scenario_hash
+        self.encoded = encoded
+        self.snapshot: bytes | None = None
+        """Initialized simulator shared by the runs, see `snapshot_scenario`."""
+
+    @property
+    def payload(self) -> dict | bytes:
+        """
+        What is sent to the workers. Pickled bytes are cheap to copy into each job,
+        and workers that restore a snapshot of the scenario never unpickle them.
+        """
+        return self.encoded if self.encoded is not None else self.input_file
 
 
 class SimulationService:
+    _services_being_provisioned: set = set()
+    """Services this run started provisioning that may not be done yet."""
+
+    @staticmethod
+    async def prepare_scenario(input_file: dict, encode: bool) -> PreparedScenario:
+        scenario_hash = await asyncio.to_thread(
+            ResultCacheService.scenario_hash, input_file
+        )
+        encoded = (
+            await asyncio.to_thread(pickle.dumps, input_file, pickle.HIGHEST_PROTOCOL)
+            if encode
+            else None
+        )
+        return PreparedScenario(input_file, scenario_hash, encoded)
+
+    @staticmethod
+    async def snapshot_scenario(
+        prepared_scenario: PreparedScenario, seed_value: int = Config.SIMULATION_SEED
+    ) -> None:
+        """
+        Initialize the scenario once, in a single worker, so that the runs sharing
+        `prepared_scenario` restore copies of that state instead of each parsing
+        and initializing the scenario.
+        """
+        try:
+            prepared_scenario.snapshot = await WorkerPoolService.submit(
+                SimulationService._snapshot_scenario_in_the_background,
+                prepared_scenario.payload,
+                REQUEST_UUID.get(),
+                seed_value,
+                prepared_scenario.hash,
+            )
+        except SimulationWorkerError as error:
+            # Runs will initialize the scenario themselves and report the error.
+            logger.error(f"The scenario could not be initialized: {error}")
+
     @staticmethod
-    @cache(expire=60 * 5)
     async def run(
         algorithm: Callable[[Optional[dict | AlgorithmInputParameters]], None],
         input_file: dict,
         metrics_from: SimulationResultOptions,
+        seed_value: int = Config.SIMULATION_SEED,
+        prepared_scenario: PreparedScenario | None = None,
+        archive: bool = True,
     ) -> SimulationServiceOutput | None:
+        """
+        Run a simulation in the worker pool, or serve its results from cache.
+        Unless `archive` is unset, as it is for the runs of a sweep, which would
+        otherwise each ship the same scenario, the run is archived in the logger
+        service.
+        """
         logger.info(f">>>>>> [{algorithm.__name__}] <<<<<<")
-        seed_value = 428956419
-        seed(seed_value)
-        np.random.seed(seed_value)
-        logger.warning("Starting simulation process")
+
+        if prepared_scenario is None:
+            with profile_phase("scenario_hash"):
+                prepared_scenario = await SimulationService.prepare_scenario(
+                    input_file, encode=False
+                )
+        scenario_hash = prepared_scenario.hash
+        cache_key = ResultCacheService.key(
+            scenario_hash,
+            algorithm.__name__,
+            seed_value,
+            {
+                "metrics_from": metrics_from,
+                "max_steps": Config.SIMULATION_MAX_STEPS,
+                "idle_steps_limit": Config.SIMULATION_IDLE_STEPS_LIMIT,
+                "smms_negotiation_depth": Config.SMMS_NEGOTIATION_DEPTH,
+                "smms_negotiation_budget": Config.SMMS_NEGOTIATION_BUDGET,
+            },
+        )
+        timer = PROFILER.get()
+        cprofile_path = (
+            str(Path(Config.PROFILE_DIR) / f"{timer.cprofile_id}.prof")
+            if timer is not None and timer.cprofile_id is not None
+            else None
+        )
+        # A requested cProfile dump needs an actual run.
+        if cprofile_path is None:
+            with profile_phase("result_cache"):
+                cached_results = await ResultCacheService.get(cache_key)
+            if cached_results is not None:
+                logger.info(f"Simulation results served from cache: {cache_key}")
+                return cached_results
 
         request_uuid = REQUEST_UUID.get()
 
-        process = multiprocessing.Process(
-            target=SimulationService._run_and_process_simulation_in_the_background,
-            args=(input_file, algorithm, request_uuid),
-        )
-        logger.warning("Starting simulation process in the background")
-        process.start()
-        logger.warning("Waiting for simulation process to finish")
-        process.join()
-        logger.warning("Simulation process finished")
-        if process.exitcode != 0:
+        logger.warning("Running simulation in the worker pool")
+        try:
+            with profile_phase("simulation"):
+                agent_metrics, profile, run_stats = await WorkerPoolService.submit(
+                    SimulationService._run_and_process_simulation_in_the_background,
+                    prepared_scenario.payload,
+                    algorithm,
+                    request_uuid,
+                    seed_value,
+                    scenario_hash,
+                    prepared_scenario.snapshot,
+                    timer is not None,
+                    cprofile_path,
+                )
+        except SimulationWorkerError as error:
             logger.error(
-                f"There was an error in the simulation process for {algorithm.__name__}"
+                f"There was an error in the simulation process for "
+                f"{algorithm.__name__}: {error}"
             )
             raise AlgorithmException(algorithm.__name__)
+        logger.warning("Simulation process finished")
+        MetricsService.observe_simulation(
+            algorithm.__name__, run_stats["duration_seconds"], run_stats["steps"]
+        )
+        if timer is not None:
+            timer.merge(profile)
 
-        logger.warning("Fetching simulation results")
-        results = await LoggingService.get_log(request_uuid)
-        logger.warning(f"Simulation results: {type(results)}")
+        if archive:
+            with profile_phase("archive_log"):
+                LoggingService.archive_log(
+                    request_uuid,
+                    input_file,
+                    agent_metrics,
+                    algorithm.__name__,
+                )
 
-        if results is None:
+        if agent_metrics is None:
             return None
 
-        return results.get(metrics_from, [])
+        results = agent_metrics.get(metrics_from, [])
+        await ResultCacheService.set(cache_key, results)
+        return results
+
+    @staticmethod
+    async def stream(
+        algorithm: Callable[[Optional[dict | AlgorithmInputParameters]], None],
+        input_file: dict,
+        metrics_from: SimulationResultOptions,
+        seed_value: int = Config.SIMULATION_SEED,
+    ) -> AsyncIterator[list[dict]]:
+        """
+        Run a simulation and yield the metrics of each step as soon as it ends.
+        Streamed runs are neither cached nor archived in the logger service, since
+        that would mean holding their whole output.
+        """
+        logger.info(f">>>>>> [{algorithm.__name__}] streaming <<<<<<")
+        scenario_hash = await asyncio.to_thread(
+            ResultCacheService.scenario_hash, input_file
+        )
+        try:
+            async for step_metrics in WorkerPoolService.stream(
+                SimulationService._stream_simulation_in_the_background,
+                input_file,
+                algorithm,
+                metrics_from,
+                REQUEST_UUID.get(),
+                seed_value,
+                scenario_hash,
+            ):
+                yield step_metrics
+        except SimulationWorkerError as error:
+            logger.error(
+                f"There was an error in the simulation process for "
+                f"{algorithm.__name__}: {error}"
+            )
+            raise AlgorithmException(algorithm.__name__)
 
     @staticmethod
     def stopping_criterion(model):
-        remaining_services_awaiting_placement_in_an_edge_server: list[esp.Service] = [
-            service for service in esp.Service.all() if not service.server
+        """
+        Stop once every service is placed or after `SIMULATION_MAX_STEPS` steps.
+        When `SIMULATION_IDLE_STEPS_LIMIT` is set, also stop after that many
+        consecutive steps in which no service got placed and none was being
+        provisioned, since nothing else can change the outcome of the run.
+
+        Placed services never go back to awaiting placement, so only the ones
+        still awaiting it are checked on each step. Likewise, only the services
+        seen starting a provisioning are checked for whether it is still going.
+        """
+        provisioning = SimulationService._services_being_provisioned
+        if not hasattr(model, "services_awaiting_placement"):
+            model.services_awaiting_placement = list(esp.Service.all())
+            model.idle_steps = 0
+            provisioning.update(
+                service for service in esp.Service.all() if service.being_provisioned
+            )
+
+        awaiting_placement_before = len(model.services_awaiting_placement)
+        model.services_awaiting_placement = [
+            service
+            for service in model.services_awaiting_placement
+            if not service.server
         ]
-        return (
-            model.schedule.steps == 100
-            or not remaining_services_awaiting_placement_in_an_edge_server  # noqa
+        all_placed = not model.services_awaiting_placement
+        if all_placed or model.schedule.steps >= Config.SIMULATION_MAX_STEPS:
+            return True
+
+        if Config.SIMULATION_IDLE_STEPS_LIMIT <= 0:
+            return False
+        provisioning.difference_update(
+            [service for service in provisioning if not service.being_provisioned]
         )
+        placed_none = (
+            len(model.services_awaiting_placement) == awaiting_placement_before
+        )
+        idle = placed_none and not provisioning
+        model.idle_steps = model.idle_steps + 1 if idle else 0
+        if model.idle_steps < Config.SIMULATION_IDLE_STEPS_LIMIT:
+            return False
+
+        logger.info(
+            f"Stopping at step {model.schedule.steps} "
+            f"after {model.idle_steps} idle steps"
+        )
+        return True
 
     @staticmethod
     def _run_and_process_simulation_in_the_background(
+        input_file: dict | bytes,
+        algorithm: Callable[[Optional[dict | AlgorithmInputParameters]], None],
+        request_uuid: uuid.UUID | None = None,
+        seed_value: int = Config.SIMULATION_SEED,
+        scenario_hash: str | None = None,
+        snapshot: bytes | None = None,
+        profile: bool = False,
+        cprofile_path: str | None = None,
+    ) -> tuple[dict, dict | None, dict]:
+        """
+        Run a simulation and return its agent metrics, the time spent in each of
+        its phases and steps when `profile` is set, and its duration and number of
+        steps. With `cprofile_path`, a cProfile dump of the run is also written
+        there.
+        """
+        started_at = time.perf_counter()
+        timer = PhaseTimer() if profile else None
+        PROFILER.set(timer)
+
+        simulator = SimulationService._prepare_simulator(
+            input_file, algorithm, request_uuid, seed_value, scenario_hash, snapshot
+        )
+        if timer is not None:
+            SimulationService._time_steps(simulator, timer)
+
+        profiler = cProfile.Profile() if cprofile_path else None
+        with profile_phase("run_model"):
+            if profiler is not None:
+                profiler.runcall(simulator.run_model)
+            else:
+                simulator.run_model()
+        if profiler is not None:
+            Path(cprofile_path).parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(cprofile_path)
+            SimulationService._evict_profiles(Path(cprofile_path).parent)
+
+        logger.warning("End logs inside worker process.")
+        return (
+            simulator.agent_metrics,
+            timer.as_dict() if timer is not None else None,
+            {
+                "duration_seconds": time.perf_counter() - started_at,
+                "steps": simulator.schedule.steps,
+            },
+        )
+
+    @staticmethod
+    def _evict_profiles(profile_dir: Path) -> None:
+        """
+        Keep the cProfile dumps within `PROFILE_MAX_BYTES`, the oldest being
+        removed first.
+        """
+        profiles = []
+        size_in_bytes = 0
+        for path in profile_dir.glob("*.prof"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            profiles.append((stat.st_mtime, stat.st_size, path))
+            size_in_bytes += stat.st_size
+
+        profiles.sort(key=lambda profile: profile[0])
+        # The newest dump is the one just written for this request; keep it.
+        for _, profile_size, path in profiles[:-1]:
+            if size_in_bytes <= Config.PROFILE_MAX_BYTES:
+                break
+            path.unlink(missing_ok=True)
+            size_in_bytes -= profile_size
+
+    @staticmethod
+    def _time_steps(simulator: esp.Simulator, timer: PhaseTimer) -> None:
+        """
+        Record each step's wall and CPU time and the share of it spent in the
+        algorithm. The rest of a step is agent activation and metrics collection.
+        """
+        algorithm = simulator.resource_management_algorithm
+        stopping_criterion = simulator.stopping_criterion
+        step = {
+            "started_at": time.perf_counter(),
+            "cpu_started_at": time.process_time(),
+            "algorithm_ms": 0.0,
+        }
+
+        def timed_algorithm(*args, **kwargs):
+            started_at = time.perf_counter()
+            with timer.phase("algorithm"):
+                algorithm(*args, **kwargs)
+            step["algorithm_ms"] += (time.perf_counter() - started_at) * 1000
+
+        def timed_stopping_criterion(model) -> bool:
+            # Checked once after every step, right after its metrics are collected.
+            wall_ms = (time.perf_counter() - step["started_at"]) * 1000
+            cpu_ms = (time.process_time() - step["cpu_started_at"]) * 1000
+            timer.steps.append(
+                {
+                    "step": model.schedule.steps,
+                    "wall_ms": wall_ms,
+                    "cpu_ms": cpu_ms,
+                    "algorithm_ms": step["algorithm_ms"],
+                }
+            )
+            timer.record("agents_and_metrics", wall_ms - step["algorithm_ms"], 0.0)
+            with timer.phase("stopping_criterion"):
+                stop = stopping_criterion(model)
+            step["started_at"] = time.perf_counter()
+            step["cpu_started_at"] = time.process_time()
+            step["algorithm_ms"] = 0.0
+            return stop
+
+        simulator.resource_management_algorithm = timed_algorithm
+        simulator.stopping_criterion = timed_stopping_criterion
+
+    @staticmethod
+    def _stream_simulation_in_the_background(
         input_file: dict,
         algorithm: Callable[[Optional[dict | AlgorithmInputParameters]], None],
+        metrics_from: SimulationResultOptions,
         request_uuid: uuid.UUID | None = None,
-    ) -> SimulationServiceOutput:
+        seed_value: int = Config.SIMULATION_SEED,
+        scenario_hash: str | None = None,
+    ) -> None:
+        simulator = SimulationService._prepare_simulator(
+            input_file, algorithm, request_uuid, seed_value, scenario_hash
+        )
+        sent_rows = 0
+
+        def stopping_criterion(model) -> bool:
+            # Checked once after every step, right after its metrics are collected.
+            nonlocal sent_rows
+            rows = model.agent_metrics.get(metrics_from, [])
+            emit(replace_inf_values(rows[sent_rows:]))
+            sent_rows = len(rows)
+            return SimulationService.stopping_criterion(model)
+
+        simulator.stopping_criterion = stopping_criterion
+        simulator.run_model()
+        logger.warning("End logs inside worker process.")
+
+    @staticmethod
+    def _snapshot_scenario_in_the_background(
+        input_file: dict | bytes,
+        request_uuid: uuid.UUID | None,
+        seed_value: int,
+        scenario_hash: str,
+    ) -> bytes | None:
+        REQUEST_UUID.set(request_uuid)
+        SimulationService._reset_simulation_state()
+        seed(seed_value)
+        np.random.seed(seed_value)
+
+        snapshot = SnapshotService.export(scenario_hash)
+        if snapshot is None:
+            _, snapshot = SimulationService._initialize_simulator(
+                input_file, None, seed_value, scenario_hash
+            )
+        return snapshot
+
+    @staticmethod
+    def _prepare_simulator(
+        input_file: dict | bytes,
+        algorithm: Callable[[Optional[dict | AlgorithmInputParameters]], None],
+        request_uuid: uuid.UUID | None,
+        seed_value: int,
+        scenario_hash: str | None,
+        snapshot: bytes | None = None,
+    ) -> esp.Simulator:
         REQUEST_UUID.set(request_uuid)
-        logger.configure(**logger_config())
-        logger.warning("Start logs inside new proccess.")
+        logger.warning("Start logs inside worker process.")
+
+        SimulationService._reset_simulation_state()
+        seed(seed_value)
+        np.random.seed(seed_value)
+
+        simulator: esp.Simulator | None = None
+        if scenario_hash is not None:
+            with profile_phase("snapshot_restore"):
+                simulator = SnapshotService.restore(scenario_hash, seed_value, snapshot)
+
+        if simulator is None:
+            simulator, _ = SimulationService._initialize_simulator(
+                input_file, algorithm, seed_value, scenario_hash
+            )
+
+        simulator.resource_management_algorithm = algorithm
+        logger.info(f"Starting simulation with algorithm: {algorithm.__name__}")
+        return simulator
 
-        simulator: esp.Simulator = esp.Simulator(
+    @staticmethod
+    def _initialize_simulator(
+        input_file: dict | bytes,
+        algorithm: Callable[[Optional[dict | AlgorithmInputParameters]], None] | None,
+        seed_value: int,
+        scenario_hash: str | None,
+    ) -> tuple[esp.Simulator, bytes | None]:
+        random_state = SnapshotService.random_state()
+        simulator = esp.Simulator(
             tick_duration=1,
             tick_unit="seconds",
             stopping_criterion=SimulationService.stopping_criterion,
             resource_management_algorithm=algorithm,
             dump_interval=float("inf"),
         )
+        if isinstance(input_file, bytes):
+            input_file = pickle.loads(input_file)
+        with profile_phase("initialize"):
+            simulator.initialize(input_file=input_file)
 
-        simulator.initialize(input_file=input_file)
-        logger.info(f"Starting simulation with algorithm: {algorithm.__name__}")
+        snapshot = None
+        if scenario_hash is not None:
+            with profile_phase("snapshot_save"):
+                snapshot = SnapshotService.save(
+                    scenario_hash, seed_value, simulator, random_state
+                )
+        return simulator, snapshot
 
-        simulator.run_model()
+    @staticmethod
+    def _reset_simulation_state() -> None:
+        """
+        Worker processes are reused across runs, so EdgeSimPy's class-level
+        registries must be cleared before building a new simulation.
+        """
+        for component_class in component_classes():
+            component_class._instances = []
+            component_class._object_count = 0
 
-        LoggingService.save_log(
-            request_uuid,
-            input_file,
-            simulator.agent_metrics,
-            algorithm.__name__,
-        )
+        if hasattr(esp.Simulator, "has_agents_set_up"):
+            del esp.Simulator.has_agents_set_up
+
+        SimulationService._services_being_provisioned.clear()
+        SimulationService._track_provisioning()
+
+    @staticmethod
+    def _track_provisioning() -> None:
+        """
+        Make `esp.Service.provision` record the services it is called on, so the
+        stopping criterion does not have to look through every service to tell
+        whether any is still being provisioned. Wrapped once per process.
+        """
+        provision = esp.Service.provision
+        if getattr(provision, "tracks_provisioning", False):
+            return
+
+        @functools.wraps(provision)
+        def tracked_provision(service, *args, **kwargs):
+            SimulationService._services_being_provisioned.add(service)
+            return provision(service, *args, **kwargs)
 
-        logger.warning("End logs inside new proccess.")
+        tracked_provision.tracks_provisioning = True
+        esp.Service.provision = tracked_provision
@@ -0,0 +1,172 @@
+"""
+Cache of initialized scenarios, used inside simulation workers.
+
+`Simulator.initialize` rebuilds the whole object graph from JSON on every run.
+After the first run of a scenario, the initialized state is kept as a pickle and
+later runs restore it instead of parsing the scenario again.
+"""
+
+import os
+import pickle
+import random
+from collections import OrderedDict
+from pathlib import Path
+from uuid import uuid4
+
+import edge_sim_py as esp
+import numpy as np
+from loguru import logger
+
+from src.configs.env import Config
+from src.utils.component_registry import component_classes
+
+
+class SnapshotService:
+    _snapshots: OrderedDict[str, bytes] = OrderedDict()
+    _size_in_bytes = 0
+
+    @classmethod
+    def restore(
+        cls, scenario_hash: str, seed_value: int, snapshot: bytes | None = None
+    ) -> esp.Simulator | None:
+        """
+        Rebuild the initialized simulator for a scenario, or return None on a miss.
+        A snapshot exported from another worker can be given instead.
+        """
+        if snapshot is None:
+            snapshot = cls._snapshots.get(scenario_hash)
+        if snapshot is None:
+            snapshot = cls._read_from_disk(scenario_hash)
+        if snapshot is None:
+            return None
+        state = pickle.loads(snapshot)
+        # Initialization that draws random numbers is only reusable for the same
+        # seed, since the rest of the run continues from that random state.
+        if state["random_state"] is not None and state["seed"] != seed_value:
+            return None
+
+        for component_class, (instances, object_count) in state["registries"].items():
+            component_class._instances = instances
+            component_class._object_count = object_count
+        if state["random_state"] is not None:
+            random.setstate(state["random_state"][0])
+            np.random.set_state(state["random_state"][1])
+
+        cls._remember(scenario_hash, snapshot)
+        logger.info(f"Scenario restored from snapshot: {scenario_hash}")
+        return state["simulator"]
+
+    @classmethod
+    def save(
+        cls,
+        scenario_hash: str,
+        seed_value: int,
+        simulator: esp.Simulator,
+        random_state_before_initialization: bytes,
+    ) -> bytes | None:
+        """
+        Snapshot a freshly initialized simulator and return the snapshot.
+        """
+        consumed_randomness = cls.random_state() != random_state_before_initialization
+        state = {
+            "simulator": simulator,
+            "registries": {
+                component_class: (
+                    component_class._instances,
+                    component_class._object_count,
+                )
+                for component_class in component_classes()
+            },
+            "seed": seed_value,
+            "random_state": (
+                (random.getstate(), np.random.get_state())
+                if consumed_randomness
+                else None
+            ),
+        }
+        try:
+            snapshot = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as error:
+            logger.warning(f"Scenario can't be snapshotted: {error!r}")
+            return None
+
+        cls._remember(scenario_hash, snapshot)
+        cls._write_to_disk(scenario_hash, snapshot)
+        return snapshot
+
+    @classmethod
+    def export(cls, scenario_hash: str) -> bytes | None:
+        """
+        The snapshot of a scenario, for restoring it in other workers.
+        """
+        return cls._snapshots.get(scenario_hash) or cls._read_from_disk(scenario_hash)
+
+    @staticmethod
+    def random_state() -> bytes:
+        """
+        Comparable fingerprint of the global random generators' state.
+        """
+        return pickle.dumps((random.getstate(), np.random.get_state()))
+
+    @classmethod
+    def _remember(cls, scenario_hash: str, snapshot: bytes) -> None:
+        if scenario_hash in cls._snapshots:
+            cls._size_in_bytes -= len(cls._snapshots.pop(scenario_hash))
+        if len(snapshot) > Config.SNAPSHOT_CACHE_MAX_BYTES:
+            return
+        cls._snapshots[scenario_hash] = snapshot
+        cls._size_in_bytes += len(snapshot)
+
+        while cls._size_in_bytes > Config.SNAPSHOT_CACHE_MAX_BYTES:
+            _, evicted = cls._snapshots.popitem(last=False)
+            cls._size_in_bytes -= len(evicted)
+
+    @staticmethod
+    def _read_from_disk(scenario_hash: str) -> bytes | None:
+        if not Config.SNAPSHOT_CACHE_DIR:
+            return None
+        path = Path(Config.SNAPSHOT_CACHE_DIR) / f"{scenario_hash}.pickle"
+        try:
+            snapshot = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            return None
+        return snapshot
+
+    @staticmethod
+    def _write_to_disk(scenario_hash: str, snapshot: bytes) -> None:
+        """
+        Keep the snapshot on disk for other workers, within
+        `SNAPSHOT_CACHE_MAX_BYTES`. Reads refresh a snapshot's modification time,
+        so the least recently used ones are removed first.
+        """
+        if not Config.SNAPSHOT_CACHE_DIR:
+            return
+        cache_dir = Path(Config.SNAPSHOT_CACHE_DIR)
+        temporary_path = cache_dir / f"{scenario_hash}.{uuid4().hex}.tmp"
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            temporary_path.write_bytes(snapshot)
+            temporary_path.rename(cache_dir / f"{scenario_hash}.pickle")
+            SnapshotService._evict_from_disk(cache_dir)
+        except OSError as error:
+            logger.error(f"Error writing snapshot to the disk cache: {error}")
+
+    @staticmethod
+    def _evict_from_disk(cache_dir: Path) -> None:
+        snapshots = []
+        size_in_bytes = 0
+        for path in cache_dir.glob("*.pickle"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            snapshots.append((stat.st_mtime, stat.st_size, path))
+            size_in_bytes += stat.st_size
+
+        snapshots.sort(key=lambda snapshot: snapshot[0])
+        for _, snapshot_size, path in snapshots:
+            if size_in_bytes <= Config.SNAPSHOT_CACHE_MAX_BYTES:
+                break
+            path.unlink(missing_ok=True)
+            size_in_bytes -= snapshot_size
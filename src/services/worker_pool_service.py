@@ -0,0 +1,396 @@
+"""
+Long-lived pool of pre-warmed simulation worker processes.
+
+Each worker is a spawned process that imports EdgeSimPy and the algorithms once
+and then serves jobs over a pipe, so a request no longer pays interpreter startup.
+A worker that crashes only fails its own job and is replaced; workers are also
+recycled after a number of jobs or once their peak memory crosses a threshold.
+
+Jobs can `emit` events while they run. `WorkerPoolService.stream` yields them as
+they arrive, and the worker blocks on a full pipe while the consumer lags behind.
+
+Every result carries the worker's peak memory, which, together with the jobs in
+flight and the time workers spend busy, is reported by `WorkerPoolService.metrics`.
+"""
+
+import asyncio
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from multiprocessing.connection import Connection
+from typing import Any, AsyncIterator, Callable
+
+from loguru import logger
+
+from src.configs.env import Config
+from src.exceptions.worker_exceptions import (
+    SimulationCancelledError,
+    SimulationWorkerError,
+)
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+def _peak_memory_mb() -> float:
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def _warm_up() -> None:
+    """Pays the heavy imports once, before the worker accepts its first job."""
+    import edge_sim_py  # noqa: F401
+
+    import src.esp_algorithms  # noqa: F401
+    from src.configs.loguru import logger_config
+
+    logger.configure(**logger_config())
+
+
+_job_connection: Connection | None = None
+"""Connection of the job running in this worker process, if any."""
+
+
+def emit(event: Any) -> None:
+    """
+    Send an event to whoever is streaming the current job. Blocks while the
+    consumer is behind, and raises `SimulationCancelledError` once it has cancelled
+    the job. Outside of a worker process, it does nothing.
+    """
+    if _job_connection is None:
+        return
+    while _job_connection.poll():
+        if _job_connection.recv() == "cancel":
+            raise SimulationCancelledError("Simulation job cancelled")
+    _job_connection.send(("event", event, False, None))
+
+
+def _worker_main(connection: Connection, max_jobs: int, max_memory_mb: int) -> None:
+    _warm_up()
+    try:
+        _serve(connection, max_jobs, max_memory_mb)
+    finally:
+        # Worker processes exit without running atexit handlers, so flush the
+        # records still queued for the log sink.
+        logger.complete()
+
+
+def _serve(connection: Connection, max_jobs: int, max_memory_mb: int) -> None:
+    global _job_connection
+
+    _job_connection = connection
+    jobs_done = 0
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        if job == "cancel":
+            # The job this was meant for finished before it was read.
+            continue
+
+        function, args, kwargs = job
+        try:
+            status, payload = "ok", function(*args, **kwargs)
+        except SimulationCancelledError as error:
+            logger.info("Simulation job cancelled")
+            status, payload = "error", str(error)
+        except Exception as error:
+            logger.exception("Simulation job failed")
+            status, payload = "error", f"{type(error).__name__}: {error}"
+
+        jobs_done += 1
+        peak_memory_mb = _peak_memory_mb()
+        recycle = jobs_done >= max_jobs or peak_memory_mb >= max_memory_mb
+        try:
+            connection.send((status, payload, recycle, peak_memory_mb))
+        except Exception as error:
+            connection.send(
+                (
+                    "error",
+                    f"Unable to send job result: {error}",
+                    recycle,
+                    peak_memory_mb,
+                )
+            )
+        if recycle:
+            return
+
+
+class _Worker:
+    def __init__(self, context: multiprocessing.context.BaseContext, index: int):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(
+                child_connection,
+                Config.SIMULATION_WORKER_MAX_JOBS,
+                Config.SIMULATION_WORKER_MAX_MEMORY_MB,
+            ),
+            name=f"simulation-worker-{index}",
+            daemon=True,
+        )
+        self.process.start()
+        child_connection.close()
+        self.peak_memory_mb = 0.0
+        """Peak memory of the process, as of its last job."""
+
+    def stop(self, timeout: float = 5) -> None:
+        try:
+            self.connection.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.connection.close()
+
+
+class WorkerPoolService:
+    _context = multiprocessing.get_context("spawn")
+    _lock = threading.Lock()
+    _workers: list[_Worker] = []
+    _idle: queue.Queue[_Worker] = queue.Queue()
+    _executor: ThreadPoolExecutor | None = None
+    _spawned = 0
+
+    _jobs_in_flight = 0
+    _busy_workers = 0
+    _busy_seconds_total = 0.0
+    _jobs_total: dict[str, int] = {"ok": 0, "error": 0}
+
+    @classmethod
+    def start(cls, size: int | None = None) -> None:
+        """
+        Spawn and warm up the pool's workers. Calling it again is a no-op.
+        """
+        with cls._lock:
+            if cls._workers:
+                return
+            size = max(1, size or Config.SIMULATION_WORKERS)
+            logger.info(f"Starting simulation worker pool with {size} workers")
+            for _ in range(size):
+                cls._idle.put(cls._spawn())
+            # One waiter thread per worker; extra jobs queue in the executor
+            # without holding a thread.
+            cls._executor = ThreadPoolExecutor(
+                max_workers=size, thread_name_prefix="simulation-waiter"
+            )
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """
+        Stop every worker, waiting for idle ones to exit gracefully.
+        """
+        with cls._lock:
+            workers, cls._workers = cls._workers, []
+            executor, cls._executor = cls._executor, None
+            cls._idle = queue.Queue()
+        logger.info(f"Stopping {len(workers)} simulation workers")
+        for worker in workers:
+            worker.stop()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    @classmethod
+    async def submit(cls, function: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Awaitable version of `run`: the event loop stays free while the job waits
+        for a worker and runs.
+        """
+        cls.start()
+        loop = asyncio.get_running_loop()
+        return await cls._track(
+            loop.run_in_executor(
+                cls._executor, partial(cls.run, function, *args, **kwargs)
+            )
+        )
+
+    @classmethod
+    async def stream(
+        cls, function: Callable[..., Any], *args, **kwargs
+    ) -> AsyncIterator[Any]:
+        """
+        Run `function(*args, **kwargs)` on a worker and yield the events it emits.
+
+        At most `SIMULATION_STREAM_BUFFER` events are held; past that, the worker
+        waits for the consumer. Closing the iterator early cancels the job.
+        """
+        cls.start()
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue[tuple[bool, Any]] = asyncio.Queue()
+        buffer_slots = asyncio.Semaphore(Config.SIMULATION_STREAM_BUFFER)
+        cancelled = threading.Event()
+
+        async def put(event: Any) -> None:
+            await buffer_slots.acquire()
+            events.put_nowait((False, event))
+
+        def on_event(event: Any) -> None:
+            future = asyncio.run_coroutine_threadsafe(put(event), loop)
+            while not cancelled.is_set():
+                try:
+                    return future.result(timeout=0.1)
+                except TimeoutError:
+                    continue
+            future.cancel()
+
+        job = cls._track(
+            loop.run_in_executor(
+                cls._executor,
+                partial(cls._run, function, args, kwargs, on_event, cancelled),
+            )
+        )
+        job.add_done_callback(lambda _: events.put_nowait((True, None)))
+        try:
+            while True:
+                done, event = await events.get()
+                if done:
+                    break
+                buffer_slots.release()
+                yield event
+            await job
+        finally:
+            cancelled.set()
+            if not job.done():
+                # Wait for the worker to acknowledge, so it is free for the next job.
+                await asyncio.gather(job, return_exceptions=True)
+
+    @classmethod
+    def metrics(cls) -> dict:
+        """
+        Gauges and counters describing the pool's load.
+        """
+        workers = list(cls._workers)
+        return {
+            "workers": len(workers),
+            "busy_workers": cls._busy_workers,
+            "jobs_in_flight": cls._jobs_in_flight,
+            "jobs_queued": max(0, cls._jobs_in_flight - cls._busy_workers),
+            "busy_seconds_total": cls._busy_seconds_total,
+            "jobs_total": dict(cls._jobs_total),
+            "worker_peak_memory_mb": {
+                worker.process.name: worker.peak_memory_mb for worker in workers
+            },
+        }
+
+    @classmethod
+    def _track(cls, job: asyncio.Future) -> asyncio.Future:
+        """
+        Count `job` as in flight until it is done. Called on the event loop.
+        """
+        cls._jobs_in_flight += 1
+
+        def untrack(_: asyncio.Future) -> None:
+            cls._jobs_in_flight -= 1
+
+        job.add_done_callback(untrack)
+        return job
+
+    @classmethod
+    def run(cls, function: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run `function(*args, **kwargs)` on an idle worker and return its result.
+
+        The function and its arguments must be picklable. Blocks until a worker is
+        free and the job has finished.
+        """
+        return cls._run(function, args, kwargs)
+
+    @classmethod
+    def _run(
+        cls,
+        function: Callable[..., Any],
+        args: tuple,
+        kwargs: dict,
+        on_event: Callable[[Any], None] | None = None,
+        cancelled: threading.Event | None = None,
+    ) -> Any:
+        cls.start()
+        worker = cls._idle.get()
+        with cls._lock:
+            cls._busy_workers += 1
+        started_at = time.perf_counter()
+        status, recycle = "error", True
+        try:
+            worker.connection.send((function, args, kwargs))
+            status, payload, recycle, worker.peak_memory_mb = cls._receive(
+                worker, on_event, cancelled
+            )
+            if recycle:
+                logger.info(f"Recycling simulation worker {worker.process.name}")
+        except (EOFError, OSError) as error:
+            logger.error(
+                f"Simulation worker {worker.process.name} died "
+                f"(exit code {worker.process.exitcode})"
+            )
+            raise SimulationWorkerError("Simulation worker died mid-job") from error
+        finally:
+            # However the job ended, the worker goes back to the pool, unless it is
+            # due for recycling or its pipe may still hold part of the job.
+            cls._finish_job(started_at, status)
+            if recycle:
+                cls._replace(worker)
+            else:
+                cls._idle.put(worker)
+
+        if status == "error":
+            raise SimulationWorkerError(payload)
+        return payload
+
+    @classmethod
+    def _finish_job(cls, started_at: float, status: str) -> None:
+        with cls._lock:
+            cls._busy_workers -= 1
+            cls._busy_seconds_total += time.perf_counter() - started_at
+            cls._jobs_total[status] += 1
+
+    @staticmethod
+    def _receive(
+        worker: _Worker,
+        on_event: Callable[[Any], None] | None,
+        cancelled: threading.Event | None,
+    ) -> tuple[str, Any, bool, float]:
+        cancel_sent = False
+        while True:
+            if cancelled is not None:
+                if cancelled.is_set() and not cancel_sent:
+                    worker.connection.send("cancel")
+                    cancel_sent = True
+                if not worker.connection.poll(0.1):
+                    continue
+
+            status, payload, recycle, peak_memory_mb = worker.connection.recv()
+            if status != "event":
+                return status, payload, recycle, peak_memory_mb
+            if on_event is not None and not cancel_sent:
+                on_event(payload)
+
+    @classmethod
+    def _spawn(cls) -> _Worker:
+        cls._spawned += 1
+        worker = _Worker(cls._context, cls._spawned)
+        cls._workers.append(worker)
+        return worker
+
+    @classmethod
+    def _replace(cls, worker: _Worker) -> None:
+        worker.stop()
+        with cls._lock:
+            if worker not in cls._workers:
+                return
+            cls._workers.remove(worker)
+            cls._idle.put(cls._spawn())
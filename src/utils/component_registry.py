@@ -0,0 +1,14 @@
+from edge_sim_py.component_manager import ComponentManager
+
+
+def component_classes() -> list[type[ComponentManager]]:
+    """
+    Every EdgeSimPy component class, including subclasses defined by this API.
+    """
+    classes = []
+    pending = ComponentManager.__subclasses__()
+    while pending:
+        component_class = pending.pop()
+        classes.append(component_class)
+        pending.extend(component_class.__subclasses__())
+    return classes
@@ -16,3 +16,23 @@ class SimulationResultOptions(StrEnum):
     """
 
     SERVICE = auto()
+
+
+class SimulationResultFormat(StrEnum):
+    """
+    Enum for the layouts of simulation results.
+    """
+
+    ROWS = auto()
+    COLUMNAR = auto()
+
+
+class SimulationJobStatus(StrEnum):
+    """
+    Enum for the lifecycle states of a simulation job.
+    """
+
+    PENDING = auto()
+    RUNNING = auto()
+    FINISHED = auto()
+    FAILED = auto()
@@ -0,0 +1,107 @@
+import contextvars
+import re
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Iterator
+from uuid import uuid4
+
+
+class PhaseTimer:
+    """
+    Wall and CPU time spent in each phase of a request or a simulation run, plus
+    the time of each simulation step.
+
+    CPU time is the process' CPU time, so in the API process it also counts work
+    done concurrently for other requests.
+    """
+
+    def __init__(self, cprofile: bool = False):
+        self.phases: dict[str, dict[str, float]] = {}
+        self.steps: list[dict[str, float]] = []
+        self.cprofile_id: str | None = str(uuid4()) if cprofile else None
+        """Name of the cProfile dump captured for this request, if requested."""
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started_at, cpu_started_at = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.record(
+                name,
+                (time.perf_counter() - started_at) * 1000,
+                (time.process_time() - cpu_started_at) * 1000,
+            )
+
+    def record(self, name: str, wall_ms: float, cpu_ms: float, count: int = 1) -> None:
+        phase = self.phases.setdefault(
+            name, {"wall_ms": 0.0, "cpu_ms": 0.0, "count": 0}
+        )
+        phase["wall_ms"] += wall_ms
+        phase["cpu_ms"] += cpu_ms
+        phase["count"] += count
+
+    def merge(self, profile: dict | None) -> None:
+        """
+        Add the phases and steps of a profile recorded elsewhere, such as in a
+        simulation worker.
+        """
+        if not profile:
+            return
+        for name, phase in profile["phases"].items():
+            self.record(name, phase["wall_ms"], phase["cpu_ms"], phase["count"])
+        self.steps.extend(profile["steps"])
+
+    def as_dict(self) -> dict:
+        profile = {"phases": self.phases, "steps": self.steps}
+        if self.cprofile_id is not None:
+            profile["cprofile"] = self.cprofile_id
+        return profile
+
+    def server_timing(self) -> str:
+        """
+        The phases as a `Server-Timing` header value.
+        """
+        return ", ".join(
+            f"{re.sub(r'[^A-Za-z0-9_-]', '-', name)};dur={phase['wall_ms']:.2f}"
+            for name, phase in self.phases.items()
+        )
+
+
+PROFILER: contextvars.ContextVar[PhaseTimer | None] = contextvars.ContextVar(
+    "profiler", default=None
+)
+
+
+@contextmanager
+def profile_phase(name: str) -> Iterator[None]:
+    """
+    Time a phase in the current `PhaseTimer`, if profiling is enabled.
+    """
+    timer = PROFILER.get()
+    if timer is None:
+        yield
+        return
+    with timer.phase(name):
+        yield
+
+
+def profiled(name: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator that times every call of a function as a phase of the current
+    `PhaseTimer`. Costs a context variable lookup when profiling is disabled.
+    """
+
+    def decorator(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            timer = PROFILER.get()
+            if timer is None:
+                return function(*args, **kwargs)
+            with timer.phase(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
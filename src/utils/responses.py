@@ -0,0 +1,65 @@
+import typing
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response encoded by pydantic-core in a single pass, with the same
+    compact output as `JSONResponse`.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+class ModelProjection:
+    """
+    Shapes trusted dicts, keyed by alias, like validating them into `model` and
+    dumping them by alias would, without validating them: only the model's fields
+    are kept, in its order, and nested models are shaped the same way.
+
+    The aliases are looked up once, when the projection is created.
+    """
+
+    def __init__(self, model: type[BaseModel]):
+        self.fields: tuple[tuple[str, ModelProjection | None], ...] = tuple(
+            (field.alias or name, self._nested_projection(field.annotation))
+            for name, field in model.model_fields.items()
+        )
+
+    def __call__(self, row: dict | None) -> dict | None:
+        if row is None:
+            return None
+        return {
+            alias: nested(row.get(alias)) if nested is not None else row.get(alias)
+            for alias, nested in self.fields
+        }
+
+    def columns(self, rows: list[dict]) -> dict[str, list]:
+        """
+        The shaped rows as one list of values per field, keyed by alias.
+        """
+        return {
+            alias: (
+                [nested(row.get(alias)) for row in rows]
+                if nested is not None
+                else [row.get(alias) for row in rows]
+            )
+            for alias, nested in self.fields
+        }
+
+    def many(self, rows: list[dict] | None) -> list[dict] | None:
+        if rows is None:
+            return None
+        return list(map(self, rows))
+
+    @staticmethod
+    def _nested_projection(annotation: Any) -> "ModelProjection | None":
+        for candidate in (annotation, *typing.get_args(annotation)):
+            if isinstance(candidate, type) and issubclass(candidate, BaseModel):
+                return ModelProjection(candidate)
+        return None
@@ -0,0 +1,63 @@
+"""
+Fixtures shared by the tests: an API client whose simulations are faked in the
+test process, and whose files go to a temporary directory.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.app import get_app
+from src.configs.env import Config
+from src.services.simulation_service import SimulationService
+from src.services.worker_pool_service import WorkerPoolService
+
+
+def service_states(steps: int = 3, services: int = 2) -> list[dict]:
+    return [
+        {
+            "Object": f"Service_{service}",
+            "Time Step": step,
+            "Instance ID": service,
+            "Available": True,
+            "Server": step % 2,
+            "Being Provisioned": False,
+            "Last Migration": None,
+        }
+        for step in range(1, steps + 1)
+        for service in range(1, services + 1)
+    ]
+
+
+@pytest.fixture
+def simulations(monkeypatch) -> list[dict]:
+    """
+    Replace simulations with a fake that returns `service_states()`, or fails
+    when the scenario is `{"fail": true}`. Returns the arguments of each run.
+    """
+    runs = []
+
+    async def run(algorithm, input_file, metrics_from, seed_value=0, **kwargs):
+        runs.append(
+            {"algorithm": algorithm.__name__, "input_file": input_file, **kwargs}
+        )
+        if input_file.get("fail"):
+            raise RuntimeError("The simulation failed")
+        return service_states()
+
+    monkeypatch.setattr(SimulationService, "run", staticmethod(run))
+    return runs
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path, simulations) -> TestClient:
+    for setting in (
+        "SIMULATION_JOBS_DIR",
+        "METRICS_DIR",
+        "PROFILE_DIR",
+        "LOG_SPOOL_DIR",
+    ):
+        monkeypatch.setattr(Config, setting, str(tmp_path / setting.lower()))
+    monkeypatch.setattr(WorkerPoolService, "start", lambda size=None: None)
+    monkeypatch.setattr(WorkerPoolService, "shutdown", lambda: None)
+    with TestClient(get_app()) as client:
+        yield client
@@ -0,0 +1,66 @@
+import json
+
+from src.configs.env import Config
+from tests.conftest import service_states
+
+BATCH = {
+    "url_or_json": {"EdgeServer": []},
+    "algorithms": ["thea", "smms"],
+    "seeds": [1, 2],
+}
+
+SUMMARY = {"steps": 3, "services": 2, "placed_services": 2, "all_placed_at_step": 1}
+
+
+def test_batch_runs_every_algorithm_and_seed_in_sweep_order(client, simulations):
+    response = client.post("/simulation/batch", json=BATCH)
+
+    assert response.status_code == 200
+    assert [(run["algorithm"], run["seed"]) for run in response.json()["runs"]] == [
+        ("thea", 1),
+        ("thea", 2),
+        ("smms", 1),
+        ("smms", 2),
+    ]
+    assert all(run["summary"] == SUMMARY for run in response.json()["runs"])
+    assert all(run["Service"] is None for run in response.json()["runs"])
+
+
+def test_batch_shares_one_scenario_and_does_not_archive_its_runs(client, simulations):
+    client.post("/simulation/batch", json=BATCH)
+
+    assert len(simulations) == 4
+    assert len({id(run["prepared_scenario"]) for run in simulations}) == 1
+    assert not any(run["archive"] for run in simulations)
+
+
+def test_batch_includes_results_on_request(client):
+    response = client.post(
+        "/simulation/batch", json={**BATCH, "seeds": [1], "include_results": True}
+    )
+
+    assert all(run["Service"] == service_states() for run in response.json()["runs"])
+
+
+def test_batch_streams_one_run_per_line(client):
+    response = client.post(
+        "/simulation/batch", json=BATCH, headers={"Accept": "application/x-ndjson"}
+    )
+    runs = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert sorted((run["algorithm"], run["seed"]) for run in runs) == [
+        ("smms", 1),
+        ("smms", 2),
+        ("thea", 1),
+        ("thea", 2),
+    ]
+
+
+def test_batch_with_too_many_runs_is_rejected(client, simulations, monkeypatch):
+    monkeypatch.setattr(Config, "SIMULATION_BATCH_MAX_RUNS", 3)
+
+    response = client.post("/simulation/batch", json=BATCH)
+
+    assert response.status_code == 400
+    assert simulations == []
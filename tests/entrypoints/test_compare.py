@@ -0,0 +1,63 @@
+import pytest
+
+from src.esp_algorithms import algorithm_options
+from src.exceptions.http_exceptions import AlgorithmException
+from src.services.simulation_service import SimulationService
+from tests.conftest import service_states
+
+COMPARISON = {"url_or_json": {"EdgeServer": []}, "algorithms": ["smms", "thea"]}
+
+
+@pytest.fixture(autouse=True)
+def snapshots(monkeypatch) -> None:
+    async def snapshot_scenario(prepared_scenario, seed_value=0):
+        prepared_scenario.snapshot = b"snapshot"
+
+    monkeypatch.setattr(
+        SimulationService, "snapshot_scenario", staticmethod(snapshot_scenario)
+    )
+
+
+def test_compare_reports_deltas_against_the_first_algorithm(client, monkeypatch):
+    steps = {algorithm_options["smms"]: 3, algorithm_options["thea"]: 5}
+
+    async def run(algorithm, input_file, metrics_from, seed_value=0, **kwargs):
+        return service_states(steps=steps[algorithm])
+
+    monkeypatch.setattr(SimulationService, "run", staticmethod(run))
+
+    response = client.post("/simulation/compare", json=COMPARISON)
+    body = response.json()
+
+    assert response.status_code == 200
+    assert body["baseline"] == "smms"
+    assert [run["algorithm"] for run in body["runs"]] == ["smms", "thea"]
+    assert [run["delta"]["steps"] for run in body["runs"]] == [0, 2]
+    assert [run["delta"]["all_placed_at_step"] for run in body["runs"]] == [0, 0]
+    assert all(run["Service"] is None for run in body["runs"])
+
+
+def test_compare_runs_share_one_snapshot_and_are_not_archived(client, simulations):
+    client.post("/simulation/compare", json={**COMPARISON, "seed": 7})
+
+    assert [run["algorithm"] for run in simulations] == [
+        algorithm_options["smms"].__name__,
+        algorithm_options["thea"].__name__,
+    ]
+    assert all(run["prepared_scenario"].snapshot == b"snapshot" for run in simulations)
+    assert not any(run["archive"] for run in simulations)
+
+
+def test_compare_reports_a_failed_run_without_a_delta(client, monkeypatch):
+    async def run(algorithm, input_file, metrics_from, seed_value=0, **kwargs):
+        if algorithm is algorithm_options["thea"]:
+            raise AlgorithmException(algorithm.__name__)
+        return service_states()
+
+    monkeypatch.setattr(SimulationService, "run", staticmethod(run))
+
+    runs = client.post("/simulation/compare", json=COMPARISON).json()["runs"]
+
+    assert runs[0]["delta"]["steps"] == 0
+    assert runs[1]["delta"] is None
+    assert "thea" in runs[1]["error"]
@@ -0,0 +1,91 @@
+import time
+
+from src.configs.env import Config
+from tests.conftest import service_states
+
+SCENARIO = {"algorithm": "thea", "url_or_json": {"EdgeServer": []}}
+
+
+def wait_for(client, job_id: str) -> dict:
+    for _ in range(100):
+        job = client.get(f"/simulation/jobs/{job_id}").json()
+        if job["status"] in ("finished", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_submitted_job_finishes_with_the_simulation_result(client):
+    response = client.post("/simulation/jobs", json=SCENARIO)
+
+    assert response.status_code == 202
+    assert response.json()["status"] == "pending"
+
+    job = wait_for(client, response.json()["id"])
+    result = client.get(f"/simulation/jobs/{job['id']}/result")
+
+    assert job["status"] == "finished"
+    assert result.status_code == 200
+    assert result.json() == {"Service": service_states()}
+
+
+def test_failed_job_reports_its_error(client):
+    job_id = client.post(
+        "/simulation/jobs", json={**SCENARIO, "url_or_json": {"fail": True}}
+    ).json()["id"]
+
+    job = wait_for(client, job_id)
+    result = client.get(f"/simulation/jobs/{job_id}/result")
+
+    assert job["status"] == "failed"
+    assert "thea" in job["error"]
+    assert result.status_code == 400
+
+
+def test_unknown_job_is_not_found(client):
+    job_id = "00000000-0000-0000-0000-000000000000"
+
+    assert client.get(f"/simulation/jobs/{job_id}").status_code == 404
+    assert client.get(f"/simulation/jobs/{job_id}/result").status_code == 404
+
+
+def test_job_state_is_shared_through_the_jobs_directory(client, tmp_path):
+    job_id = client.post("/simulation/jobs", json=SCENARIO).json()["id"]
+    wait_for(client, job_id)
+
+    files = sorted(path.name for path in (tmp_path / "simulation_jobs_dir").iterdir())
+
+    assert files == [f"{job_id}.done.json", f"{job_id}.result.json"]
+
+
+def test_oldest_done_jobs_are_removed_past_the_byte_budget(client, monkeypatch):
+    monkeypatch.setattr(Config, "SIMULATION_JOBS_MAX_BYTES", 1500)
+
+    first_job_id = client.post("/simulation/jobs", json=SCENARIO).json()["id"]
+    wait_for(client, first_job_id)
+    time.sleep(0.01)
+    last_job_id = client.post("/simulation/jobs", json=SCENARIO).json()["id"]
+    wait_for(client, last_job_id)
+
+    assert client.get(f"/simulation/jobs/{first_job_id}").status_code == 404
+    assert client.get(f"/simulation/jobs/{last_job_id}/result").status_code == 200
+
+
+def test_synchronous_runs_are_not_kept_as_jobs(client, tmp_path):
+    response = client.post("/simulation/services", json=SCENARIO)
+
+    assert response.status_code == 200
+    assert response.json()["Service"] == service_states()
+    assert not (tmp_path / "simulation_jobs_dir").exists()
+
+
+def test_profiled_job_keeps_its_profile(client):
+    plain_job_id = client.post("/simulation/jobs", json=SCENARIO).json()["id"]
+    job_id = client.post("/simulation/jobs?cprofile=true", json=SCENARIO).json()["id"]
+
+    plain_job = wait_for(client, plain_job_id)
+    job = wait_for(client, job_id)
+
+    assert plain_job["profile"] is None
+    assert job["profile"]["phases"] == {}
+    assert job["profile"]["cprofile"]
@@ -0,0 +1,55 @@
+import json
+import time
+
+from src.services.result_cache_service import ResultCacheService
+from src.services.scenario_service import ScenarioService
+
+
+def samples(text: str) -> dict[str, float]:
+    return {
+        name: float(value)
+        for name, value in (
+            line.rsplit(" ", 1) for line in text.splitlines() if line[0] != "#"
+        )
+    }
+
+
+def test_metrics_report_the_result_and_scenario_caches(client, monkeypatch):
+    monkeypatch.setattr(ResultCacheService, "hits", 3)
+    monkeypatch.setattr(ResultCacheService, "misses", 1)
+    monkeypatch.setattr(ScenarioService, "hits", 5)
+    monkeypatch.setattr(ScenarioService, "misses", 2)
+
+    response = client.get("/metrics")
+    metrics = samples(response.text)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert metrics["result_cache_hits_total"] == 3
+    assert metrics["result_cache_misses_total"] == 1
+    assert metrics["scenario_cache_hits_total"] == 5
+    assert metrics["scenario_cache_misses_total"] == 2
+    assert "# TYPE scenario_cache_hits_total counter" in response.text
+
+
+def test_metrics_keep_the_counters_of_a_dead_process(client, tmp_path):
+    dead_process = {
+        "pid": 0,
+        "written_at": time.time() - 3600,
+        "alive": True,
+        "counters": {"simulation_jobs_total": {'{status="ok"}': 4}},
+        "gauges": {"simulation_workers": {"": 8}},
+        "histograms": {
+            "simulation_steps": {
+                '{algorithm="thea"}': {"counts": [0, 1] + [0] * 9, "sum": 2.0}
+            }
+        },
+    }
+    (tmp_path / "metrics_dir" / "0.json").write_text(json.dumps(dead_process))
+
+    metrics = samples(client.get("/metrics").text)
+
+    assert metrics['simulation_jobs_total{status="ok"}'] == 4
+    assert metrics['simulation_steps_bucket{algorithm="thea",le="2"}'] == 1
+    assert metrics['simulation_steps_count{algorithm="thea"}'] == 1
+    assert metrics["simulation_workers"] == 0
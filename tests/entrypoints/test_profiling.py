@@ -0,0 +1,33 @@
+import os
+
+from src.configs.env import Config
+from src.services.simulation_service import SimulationService
+
+SCENARIO = {"algorithm": "thea", "url_or_json": {"EdgeServer": []}}
+
+
+def test_simulation_is_not_timed_unless_profiled(client):
+    response = client.post("/simulation/services", json=SCENARIO)
+
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
+    assert "profile" not in response.json()
+
+
+def test_profiled_simulation_returns_its_timings(client):
+    response = client.post("/simulation/services?profile=true", json=SCENARIO)
+
+    assert "server-timing" in response.headers
+    assert response.json()["profile"] == {"phases": {}, "steps": []}
+
+
+def test_oldest_profiles_are_removed_past_the_byte_budget(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "PROFILE_MAX_BYTES", 25)
+    for age, name in enumerate(["newest", "newer", "older", "oldest"]):
+        path = tmp_path / f"{name}.prof"
+        path.write_bytes(b"x" * 10)
+        os.utime(path, (1000 - age, 1000 - age))
+
+    SimulationService._evict_profiles(tmp_path)
+
+    assert sorted(path.stem for path in tmp_path.iterdir()) == ["newer", "newest"]
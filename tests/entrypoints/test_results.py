@@ -0,0 +1,48 @@
+from src.entrypoints.simulation_entrypoint import COLUMNAR_MEDIA_TYPE
+from tests.conftest import service_states
+
+SCENARIO = {"algorithm": "thea", "url_or_json": {"EdgeServer": []}}
+
+
+def test_results_are_returned_as_rows_by_default(client):
+    response = client.post("/simulation/services", json=SCENARIO)
+
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {"Service": service_states()}
+
+
+def test_results_are_returned_as_columns_on_request(client):
+    by_query = client.post("/simulation/services?format=columnar", json=SCENARIO)
+    by_header = client.post(
+        "/simulation/services", json=SCENARIO, headers={"Accept": COLUMNAR_MEDIA_TYPE}
+    )
+
+    for response in (by_query, by_header):
+        body = response.json()
+        assert response.headers["content-type"] == COLUMNAR_MEDIA_TYPE
+        assert body["rows"] == 6
+        assert list(body["Service"]) == list(service_states()[0])
+        assert body["Service"]["Time Step"] == [1, 1, 2, 2, 3, 3]
+        assert body["Service"]["Instance ID"] == [1, 2, 1, 2, 1, 2]
+
+
+def test_results_are_filtered_by_step_and_service(client):
+    response = client.post(
+        "/simulation/services?step_from=1&step_to=3&step_stride=2&service_id=2",
+        json=SCENARIO,
+    )
+    rows = response.json()["Service"]
+
+    assert [(row["Time Step"], row["Instance ID"]) for row in rows] == [(1, 2), (3, 2)]
+
+
+def test_filtered_results_can_be_returned_as_columns(client):
+    response = client.post(
+        "/simulation/services?format=columnar&step_from=2&service_id=1",
+        json=SCENARIO,
+    )
+    body = response.json()
+
+    assert body["rows"] == 2
+    assert body["Service"]["Time Step"] == [2, 3]
+    assert body["Service"]["Instance ID"] == [1, 1]
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from src.exceptions.http_exceptions import AlgorithmException
+from src.services.simulation_service import SimulationService
+from tests.conftest import service_states
+
+SCENARIO = {"algorithm": "thea", "url_or_json": {"EdgeServer": []}}
+
+
+def worker_rows(step: int) -> list[dict]:
+    # Rows as a worker sends them: extra keys, in any order.
+    return [
+        {"Extra": True, **dict(reversed(row.items()))}
+        for row in service_states()
+        if row["Time Step"] == step
+    ]
+
+
+@pytest.fixture
+def stream(monkeypatch):
+    async def stream(algorithm, input_file, metrics_from, seed_value=0):
+        for step in (1, 2, 3):
+            yield worker_rows(step)
+        if input_file.get("fail"):
+            raise AlgorithmException(algorithm.__name__)
+
+    monkeypatch.setattr(SimulationService, "stream", staticmethod(stream))
+
+
+def test_streamed_steps_are_shaped_like_the_services_output(client, stream):
+    services = client.post("/simulation/services", json=SCENARIO).text
+    streamed = client.post("/simulation/services/stream", json=SCENARIO).text
+
+    rows = services.removeprefix('{"Service":[').removesuffix("]}")
+    steps = [
+        line.removeprefix('{"Service":[').removesuffix("]}")
+        for line in streamed.splitlines()
+    ]
+    assert ",".join(steps) == rows
+
+
+def test_streamed_steps_as_server_sent_events(client, stream):
+    response = client.post(
+        "/simulation/services/stream",
+        json=SCENARIO,
+        headers={"Accept": "text/event-stream"},
+    )
+    events = [event.split("\n") for event in response.text.strip().split("\n\n")]
+
+    assert [event[0] for event in events] == ["event: step"] * 3 + ["event: end"]
+    assert [json.loads(event[1].removeprefix("data: ")) for event in events[:3]] == [
+        {"Service": [row for row in service_states() if row["Time Step"] == step]}
+        for step in (1, 2, 3)
+    ]
+
+
+def test_streaming_error_is_reported_in_the_stream(client, stream):
+    response = client.post(
+        "/simulation/services/stream", json={**SCENARIO, "url_or_json": {"fail": 1}}
+    )
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert len(lines) == 4
+    assert "thea" in lines[-1]["error"]
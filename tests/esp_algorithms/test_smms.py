@@ -0,0 +1,231 @@
+"""
+SMMS's steps, with proposals ranked in batches over a thread pool, checked
+against agents stepping one at a time on small random worlds of stand-in
+EdgeSimPy objects, and its migration negotiation's budget.
+"""
+
+import random
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.configs.env import Config
+from src.esp_algorithms import capacity_index
+from src.esp_algorithms.capacity_index import get_capacity_index
+from src.esp_algorithms.smms import algorithm
+from src.esp_algorithms.smms.migration_negotiation import MigrationNegotiation
+from src.esp_algorithms.smms.service_management_agent import ServiceManagementAgent
+from src.esp_algorithms.smms.user_distance_index import UserDistanceIndex
+
+
+class EdgeServer:
+    def __init__(self, id: int, rng: random.Random):
+        self.id = id
+        self.coordinates = (rng.randint(0, 10), rng.randint(0, 10))
+        self.cpu = rng.randint(2, 5)
+        self.memory = rng.randint(2, 5)
+        self.cpu_demand = 0
+        self.memory_demand = 0
+        self.services = []
+
+    def has_capacity_to_host(self, service: "Service") -> bool:
+        free_cpu = self.cpu - self.cpu_demand
+        free_memory = self.memory - self.memory_demand
+        return free_cpu >= service.cpu_demand and free_memory >= service.memory_demand
+
+
+class User:
+    def __init__(self, rng: random.Random):
+        self.coordinates = (rng.randint(0, 10), rng.randint(0, 10))
+
+
+class Service:
+    def __init__(self, id: int, rng: random.Random):
+        self.id = id
+        user = User(rng)
+        self.users = []
+        self.application = SimpleNamespace(users=[user] if rng.random() < 0.9 else [])
+        self.cpu_demand = rng.randint(1, 2)
+        self.memory_demand = rng.randint(1, 2)
+        self.server = None
+        self.being_provisioned = False
+
+    def provision(self, target_server: EdgeServer) -> None:
+        if self.server is not None:
+            self.server.cpu_demand -= self.cpu_demand
+            self.server.memory_demand -= self.memory_demand
+            self.server.services.remove(self)
+        target_server.cpu_demand += self.cpu_demand
+        target_server.memory_demand += self.memory_demand
+        target_server.services.append(self)
+        self.server = target_server
+
+
+def build_world(seed: int, servers: int = 6, services: int = 14):
+    rng = random.Random(seed)
+    edge_servers = [EdgeServer(id, rng) for id in range(1, servers + 1)]
+    # A distant server with room for everything, so that every service fits.
+    cloud = EdgeServer(servers + 1, rng)
+    cloud.coordinates, cloud.cpu, cloud.memory = (50, 50), 100, 100
+    edge_servers.append(cloud)
+    world_services = [Service(id, rng) for id in range(1, services + 1)]
+    for service in rng.sample(world_services, services // 2):
+        server = rng.choice(edge_servers)
+        if server.has_capacity_to_host(service):
+            service.provision(server)
+
+    topology = SimpleNamespace()
+    return SimpleNamespace(
+        rng=rng,
+        services=world_services,
+        esp=SimpleNamespace(
+            EdgeServer=SimpleNamespace(all=lambda: edge_servers),
+            Service=SimpleNamespace(all=lambda: world_services),
+            Simulator=type("Simulator", (), {}),
+            Topology=SimpleNamespace(first=lambda: topology),
+        ),
+    )
+
+
+def move_users(world) -> None:
+    for service in world.services:
+        for user in service.application.users:
+            if world.rng.random() < 0.3:
+                user.coordinates = (world.rng.randint(0, 10), world.rng.randint(0, 10))
+
+
+def placements(world) -> dict[int, int | None]:
+    return {
+        service.id: service.server.id if service.server is not None else None
+        for service in world.services
+    }
+
+
+@pytest.fixture
+def use_world(monkeypatch):
+    def use(world: SimpleNamespace) -> SimpleNamespace:
+        monkeypatch.setattr(algorithm, "esp", world.esp)
+        monkeypatch.setattr(capacity_index, "esp", world.esp)
+        monkeypatch.setattr(ServiceManagementAgent, "_instances", [])
+        monkeypatch.setattr(ServiceManagementAgent, "_object_count", 0)
+        monkeypatch.setattr(ServiceManagementAgent, "distance_index", None)
+        monkeypatch.setattr(ServiceManagementAgent, "negotiation", None)
+        return world
+
+    return use
+
+
+def step_agents_one_at_a_time(world, current_step: int) -> None:
+    algorithm._validate_simulation_agents_are_set()
+    ServiceManagementAgent.negotiation = MigrationNegotiation(
+        ServiceManagementAgent.distance_index,
+        get_capacity_index(world.esp.Topology.first(), current_step),
+        max_depth=Config.SMMS_NEGOTIATION_DEPTH,
+        budget=Config.SMMS_NEGOTIATION_BUDGET,
+    )
+    for agent in ServiceManagementAgent.all():
+        agent.step()
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_batched_proposals_place_services_like_sequential_steps(
+    use_world, monkeypatch, seed
+):
+    # Several chunks, spread over threads.
+    monkeypatch.setattr(Config, "SMMS_PROPOSAL_THREADS", 3)
+    monkeypatch.setattr(Config, "SMMS_PROPOSAL_CHUNK_SIZE", 2)
+    expected_world = use_world(build_world(seed))
+    expected_placements = []
+    for current_step in range(1, 4):
+        step_agents_one_at_a_time(expected_world, current_step)
+        expected_placements.append(placements(expected_world))
+        move_users(expected_world)
+
+    world = use_world(build_world(seed))
+    for current_step in range(1, 4):
+        algorithm.service_management_multiagent_system_runner(
+            {"current_step": current_step}
+        )
+
+        assert placements(world) == expected_placements[current_step - 1]
+        move_users(world)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_batched_rankings_match_rankings_computed_one_service_at_a_time(seed):
+    rng = random.Random(seed)
+    servers = [EdgeServer(id, rng) for id in range(1, 40)]
+    servers[0].coordinates = None
+    services = [Service(id, rng) for id in range(1, 60)]
+    for service in services:
+        service.users = [User(rng) for _ in range(rng.randint(0, 4))]
+
+    expected = UserDistanceIndex(servers)
+    batched = UserDistanceIndex(servers, chunk_size=4)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        batched.rank(services, executor)
+
+    for service in services:
+        expected_distances = expected.average_user_distances(service)
+        distances = batched.average_user_distances(service)
+        assert np.array_equal(distances, expected_distances)
+        assert batched.nearest_servers(service) == expected.nearest_servers(service)
+
+
+def build_crowded_world():
+    """
+    An unplaced service next to 60 full servers, each hosting 2 services that
+    could move, and an empty server far away.
+    """
+    rng = random.Random(0)
+    full_servers = []
+    for id in range(1, 61):
+        server = EdgeServer(id, rng)
+        server.coordinates, server.cpu, server.memory = (id % 5, id // 5), 2, 2
+        full_servers.append(server)
+    far_server = EdgeServer(61, rng)
+    far_server.coordinates, far_server.cpu, far_server.memory = (50, 50), 2, 2
+    edge_servers = [*full_servers, far_server]
+
+    world_services = []
+    for server in full_servers:
+        for _ in range(2):
+            service = Service(len(world_services) + 1, rng)
+            service.application.users = [User(rng)]
+            service.cpu_demand = service.memory_demand = 1
+            service.provision(server)
+            world_services.append(service)
+    unplaced = Service(len(world_services) + 1, rng)
+    unplaced.application.users = [User(rng)]
+    unplaced.application.users[0].coordinates = (0, 0)
+    unplaced.cpu_demand = unplaced.memory_demand = 1
+    world_services.append(unplaced)
+
+    topology = SimpleNamespace()
+    return SimpleNamespace(
+        unplaced=unplaced,
+        far_server=far_server,
+        esp=SimpleNamespace(
+            EdgeServer=SimpleNamespace(all=lambda: edge_servers),
+            Service=SimpleNamespace(all=lambda: world_services),
+            Simulator=type("Simulator", (), {}),
+            Topology=SimpleNamespace(first=lambda: topology),
+        ),
+    )
+
+
+@pytest.mark.parametrize("budget", [0, 10, 1000, 10**9])
+def test_running_out_of_budget_still_tries_every_candidate(use_world, budget):
+    world = use_world(build_crowded_world())
+    algorithm._validate_simulation_agents_are_set()
+    negotiation = MigrationNegotiation(
+        ServiceManagementAgent.distance_index,
+        get_capacity_index(world.esp.Topology.first(), 1),
+        max_depth=Config.SMMS_NEGOTIATION_DEPTH,
+        budget=budget,
+    )
+
+    assert negotiation.solicit(world.unplaced)
+    assert world.unplaced.server is world.far_server
@@ -0,0 +1,286 @@
+"""
+THEA's vectorized host candidate scoring checked against the original
+per-server loop, on small random worlds of stand-in EdgeSimPy objects.
+"""
+
+import random
+from types import SimpleNamespace
+
+import networkx as nx
+import pytest
+
+from src.esp_algorithms import capacity_index
+from src.esp_algorithms.thea import algorithm, related_methods
+from src.esp_algorithms.thea.related_methods import (
+    find_minimum_and_maximum,
+    get_application_delay_score,
+    get_application_privacy_score,
+    get_host_candidates,
+    get_norm,
+    rank_host_candidates,
+    sign,
+)
+
+
+class Switch:
+    def __init__(self, id: int, model: SimpleNamespace):
+        self.id = id
+        self.model = model
+
+
+class EdgeServer:
+    def __init__(self, id: int, switch: Switch, provider: int, rng: random.Random):
+        self.id = id
+        self.network_switch = switch
+        self.infrastructure_provider = provider
+        self.cpu = rng.randint(4, 8)
+        self.memory = rng.randint(4, 8)
+        self.cpu_demand = 0
+        self.memory_demand = 0
+        self.power_model_parameters = {
+            "static_power_percentage": rng.randint(1, 5) / 10,
+            "max_power_consumption": rng.randint(100, 300),
+        }
+
+    def has_capacity_to_host(self, service: "Service") -> bool:
+        free_cpu = self.cpu - self.cpu_demand
+        free_memory = self.memory - self.memory_demand
+        return free_cpu >= service.cpu_demand and free_memory >= service.memory_demand
+
+
+class Application:
+    def __init__(self, id: int):
+        self.id = id
+        self.users = []
+        self.services = []
+
+
+class Service:
+    def __init__(self, id: int, application: Application, rng: random.Random):
+        self.id = id
+        self.application = application
+        self.cpu_demand = rng.randint(1, 2)
+        self.memory_demand = rng.randint(1, 2)
+        self.privacy_requirement = rng.randint(0, 2)
+        self.server = None
+
+    def provision(self, target_server: EdgeServer) -> None:
+        target_server.cpu_demand += self.cpu_demand
+        target_server.memory_demand += self.memory_demand
+        self.server = target_server
+
+
+def build_world(seed: int, switches: int = 8, servers: int = 6, apps: int = 5):
+    rng = random.Random(seed)
+    model = SimpleNamespace(topology=nx.Graph(), schedule=SimpleNamespace(steps=1))
+    topology = model.topology
+    network_switches = [Switch(id, model) for id in range(switches)]
+    for position, switch in enumerate(network_switches[1:], start=1):
+        topology.add_edge(
+            switch, rng.choice(network_switches[:position]), delay=rng.randint(1, 10)
+        )
+    for _ in range(switches):
+        origin, target = rng.sample(network_switches, 2)
+        topology.add_edge(origin, target, delay=rng.randint(1, 10))
+
+    edge_servers = [
+        EdgeServer(id, rng.choice(network_switches), rng.randint(1, 3), rng)
+        for id in range(1, servers + 1)
+    ]
+    applications, services = [], []
+    for id in range(1, apps + 1):
+        application = Application(id)
+        user = SimpleNamespace(
+            base_station=SimpleNamespace(network_switch=rng.choice(network_switches)),
+            delays={str(id): rng.choice([None, rng.randint(1, 5)])},
+            delay_slas={str(id): rng.randint(5, 25)},
+            providers_trust={
+                str(provider): rng.randint(0, 2) for provider in (1, 2, 3)
+            },
+        )
+        application.users.append(user)
+        for _ in range(3 if id == 1 else rng.randint(1, 3)):
+            service = Service(len(services) + 1, application, rng)
+            application.services.append(service)
+            services.append(service)
+        applications.append(application)
+
+    return SimpleNamespace(
+        rng=rng,
+        topology=topology,
+        edge_servers=edge_servers,
+        applications=applications,
+        services=services,
+        esp=SimpleNamespace(
+            EdgeServer=SimpleNamespace(all=lambda: edge_servers),
+            Service=SimpleNamespace(all=lambda: services),
+            Application=SimpleNamespace(all=lambda: applications),
+            Topology=SimpleNamespace(first=lambda: topology),
+        ),
+    )
+
+
+@pytest.fixture
+def use_world(monkeypatch):
+    def use(world: SimpleNamespace) -> SimpleNamespace:
+        monkeypatch.setattr(algorithm, "esp", world.esp)
+        monkeypatch.setattr(related_methods, "esp", world.esp)
+        monkeypatch.setattr(capacity_index, "esp", world.esp)
+        return world
+
+    return use
+
+
+def baseline_path_delay(world, origin: Switch, target: Switch) -> float:
+    return nx.shortest_path_length(world.topology, origin, target, weight="delay")
+
+
+def baseline_host_candidates(world, user, service) -> list[dict]:
+    """THEA's original scoring of every edge server, one server at a time."""
+    chain = [service.application.users[0]] + service.application.services
+    prev_item = chain[chain.index(service) - 1]
+    switch_of_previous_item_in_chain = (
+        prev_item.base_station.network_switch
+        if chain.index(service) - 1 == 0
+        else prev_item.server.network_switch
+    )
+    app_delay = user.delays[str(service.application.id)] or 0
+    is_last_service = service == service.application.services[-1]
+    delay_sla = user.delay_slas[str(service.application.id)]
+
+    host_candidates = []
+    for edge_server in world.edge_servers:
+        provider = str(edge_server.infrastructure_provider)
+        power_model = edge_server.power_model_parameters
+        additional_delay = baseline_path_delay(
+            world, switch_of_previous_item_in_chain, edge_server.network_switch
+        )
+        violates_privacy_sla = (
+            user.providers_trust[provider] < service.privacy_requirement
+        )
+        violates_delay_sla = app_delay + additional_delay > delay_sla
+        power_consumption = power_model["max_power_consumption"] / edge_server.cpu
+        power_consumption += power_model["static_power_percentage"] * (
+            1 - sign(edge_server.cpu_demand)
+        )
+
+        affected_services = []
+        for affected_service in world.services:
+            if affected_service.server is not None or affected_service == service:
+                continue
+            affected_user = affected_service.application.users[0]
+            trust = affected_user.providers_trust[provider]
+            if trust < affected_service.privacy_requirement:
+                continue
+            distance = baseline_path_delay(
+                world,
+                affected_user.base_station.network_switch,
+                edge_server.network_switch,
+            )
+            affected_services.append(1 / max(1, distance))
+
+        host_candidates.append(
+            {
+                "object": edge_server,
+                "sla_violations": int(violates_delay_sla) + int(violates_privacy_sla),
+                "affected_services_cost": (
+                    sum(affected_services) if is_last_service else 0
+                ),
+                "power_consumption": power_consumption,
+                "delay_cost": additional_delay if is_last_service else 0,
+            }
+        )
+    return host_candidates
+
+
+def baseline_ranking(host_candidates: list[dict]) -> list[EdgeServer]:
+    min_and_max = find_minimum_and_maximum(metadata=host_candidates)
+    minimum, maximum = min_and_max["minimum"], min_and_max["maximum"]
+    ranked = sorted(
+        host_candidates,
+        key=lambda candidate: (
+            candidate["sla_violations"],
+            sum(
+                get_norm(candidate, attr_name, minimum, maximum)
+                for attr_name in (
+                    "affected_services_cost",
+                    "power_consumption",
+                    "delay_cost",
+                )
+            ),
+        ),
+    )
+    return [candidate["object"] for candidate in ranked]
+
+
+def baseline_thea(world) -> None:
+    """One step of THEA as it was before its scoring was vectorized."""
+    apps_metadata = [
+        {
+            "object": app,
+            "delay_score": get_application_delay_score(app=app),
+            "privacy_score": get_application_privacy_score(app=app),
+        }
+        for app in world.applications
+    ]
+    min_and_max = find_minimum_and_maximum(metadata=apps_metadata)
+    minimum, maximum = min_and_max["minimum"], min_and_max["maximum"]
+    apps_metadata.sort(
+        key=lambda app: sum(
+            get_norm(app, attr_name, minimum, maximum)
+            for attr_name in ("delay_score", "privacy_score")
+        ),
+        reverse=True,
+    )
+
+    for app_metadata in apps_metadata:
+        user = app_metadata["object"].users[0]
+        for service in app_metadata["object"].services:
+            host_candidates = baseline_host_candidates(world, user, service)
+            for edge_server in baseline_ranking(host_candidates):
+                if edge_server.has_capacity_to_host(service=service):
+                    if service.server != edge_server:
+                        service.provision(target_server=edge_server)
+                        break
+
+
+def placements(world) -> dict[int, int | None]:
+    return {
+        service.id: service.server.id if service.server is not None else None
+        for service in world.services
+    }
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_host_candidate_ranking_matches_the_original_scoring(use_world, seed):
+    world = use_world(build_world(seed))
+    for service in world.rng.sample(world.services, len(world.services) // 2):
+        service.provision(world.rng.choice(world.edge_servers))
+
+    ranked_services = 0
+    for service in world.services:
+        chain = service.application.services
+        position = chain.index(service)
+        if position > 0 and chain[position - 1].server is None:
+            continue
+        user = service.application.users[0]
+
+        ranking = rank_host_candidates(get_host_candidates(user=user, service=service))
+
+        assert ranking == baseline_ranking(
+            baseline_host_candidates(world, user, service)
+        )
+        ranked_services += 1
+    assert ranked_services
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_thea_step_places_services_like_the_original_scoring(use_world, seed):
+    expected_world = use_world(build_world(seed, apps=4))
+    baseline_thea(expected_world)
+
+    world = use_world(build_world(seed, apps=4))
+    algorithm.thea(parameters={"current_step": 1})
+
+    assert any(len(app.services) > 1 for app in world.applications)
+    assert placements(world) == placements(expected_world)
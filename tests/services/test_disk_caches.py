@@ -0,0 +1,56 @@
+import os
+
+from src.configs.env import Config
+from src.services.scenario_service import ScenarioService, _CachedScenario
+from src.services.snapshot_service import SnapshotService
+
+
+def age(path, seconds: float) -> None:
+    os.utime(path, (path.stat().st_mtime - seconds,) * 2)
+
+
+def test_least_recently_used_snapshots_are_removed_past_the_byte_budget(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setattr(Config, "SNAPSHOT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(Config, "SNAPSHOT_CACHE_MAX_BYTES", 25)
+    SnapshotService._write_to_disk("first", b"x" * 10)
+    SnapshotService._write_to_disk("second", b"x" * 10)
+    age(tmp_path / "first.pickle", 20)
+    age(tmp_path / "second.pickle", 10)
+    SnapshotService._read_from_disk("first")
+
+    SnapshotService._write_to_disk("third", b"x" * 10)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "first.pickle",
+        "third.pickle",
+    ]
+
+
+def test_least_recently_used_scenarios_are_removed_past_the_byte_budget(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setattr(Config, "SCENARIO_CACHE_DIR", str(tmp_path))
+    cached = _CachedScenario({}, 2, '"etag"', None)
+    ScenarioService._write_to_disk("https://example.com/first", b"{}", cached)
+    ScenarioService._write_to_disk("https://example.com/second", b"{}", cached)
+    first, _ = ScenarioService._disk_paths("https://example.com/first")
+    second, _ = ScenarioService._disk_paths("https://example.com/second")
+    age(first, 20)
+    age(second, 10)
+    ScenarioService._read_from_disk("https://example.com/first")
+    entry_size = sum(path.stat().st_size for path in tmp_path.iterdir()) // 2
+    monkeypatch.setattr(Config, "SCENARIO_CACHE_MAX_BYTES", 2 * entry_size)
+
+    ScenarioService._write_to_disk("https://example.com/third", b"{}", cached)
+
+    third, _ = ScenarioService._disk_paths("https://example.com/third")
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        [
+            first.name,
+            first.name.replace(".json", ".meta.json"),
+            third.name,
+            third.name.replace(".json", ".meta.json"),
+        ]
+    )